@@ -11,6 +11,7 @@ import os
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
+from delivery.routing import websocket_urlpatterns as delivery_websocket_urlpatterns
 from notifications.routing import websocket_urlpatterns
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'campus_delivery.settings')
@@ -18,6 +19,6 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'campus_delivery.settings')
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
     "websocket": AuthMiddlewareStack(
-        URLRouter(websocket_urlpatterns)
+        URLRouter(websocket_urlpatterns + delivery_websocket_urlpatterns)
     ),
 })
\ No newline at end of file
@@ -0,0 +1,11 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# Backends whose contents are private to one process
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared(alias):
+    """Whether every worker process sees the same data in cache ``alias``."""
+    return not isinstance(caches[alias], PROCESS_LOCAL_BACKENDS)
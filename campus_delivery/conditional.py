@@ -0,0 +1,37 @@
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalRetrieveMixin:
+    """Conditional GET support for detail views of models with an ``updated_at`` column.
+
+    The ETag and Last-Modified validators come from a single-column lookup, so a
+    request carrying a matching If-None-Match or If-Modified-Since gets a 304
+    before the object or any of its nested relations are loaded and serialized.
+    """
+
+    def get_validators(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        updated_at = (
+            self.filter_queryset(self.get_queryset())
+            .prefetch_related(None)
+            .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            .values_list('updated_at', flat=True)
+            .first()
+        )
+        if updated_at is None:
+            return None, None
+        model = self.get_queryset().model
+        etag = quote_etag(f"{model._meta.label_lower}-{self.kwargs[lookup_url_kwarg]}-{updated_at.timestamp():.6f}")
+        return etag, int(updated_at.timestamp())
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        if etag is None:
+            return super().retrieve(request, *args, **kwargs)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyStats:
+    """Per-endpoint call counts, error counts and latency totals for this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.calls = defaultdict(lambda: {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+
+    def record(self, key, elapsed_ms, error):
+        with self.lock:
+            entry = self.calls[key]
+            entry['count'] += 1
+            entry['errors'] += int(error)
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                key: dict(entry, avg_ms=entry['total_ms'] / entry['count'])
+                for key, entry in self.calls.items()
+            }
+
+
+stats = LatencyStats()
+
+
+class HttpClient:
+    """Outbound HTTP client for one provider, configured from ``settings.OUTBOUND_HTTP``.
+
+    Keeps a pooled keep-alive ``requests.Session``, applies a ``(connect, read)``
+    timeout per endpoint, retries connection failures (and 5xx responses for
+    idempotent methods) with backoff, and records the latency of every call.
+    """
+
+    def __init__(self, name, base_url='', timeouts=None, retries=2, backoff=0.3, pool_size=10):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeouts = timeouts or {}
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            # POST is not retried once sent, so a payment request is never duplicated
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def timeout_for(self, endpoint):
+        return self.timeouts.get(endpoint, self.timeouts.get('default', (3.05, 10)))
+
+    def request(self, method, path, endpoint='default', **kwargs):
+        kwargs.setdefault('timeout', self.timeout_for(endpoint))
+        url = path if path.startswith('http') else f"{self.base_url}{path}"
+        start = time.perf_counter()
+        error = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            error = response.status_code >= 500
+            return response
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            stats.record(f"{self.name}.{endpoint}", elapsed_ms, error)
+            logger.info("%s %s %s %s in %.1fms", self.name, endpoint, method, 'failed' if error else 'ok', elapsed_ms)
+
+    def get(self, path, endpoint='default', **kwargs):
+        return self.request('GET', path, endpoint, **kwargs)
+
+    def post(self, path, endpoint='default', **kwargs):
+        return self.request('POST', path, endpoint, **kwargs)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+@receiver(setting_changed)
+def reset_clients(setting, **kwargs):
+    # Rebuild clients when tests override their configuration.
+    if setting == 'OUTBOUND_HTTP':
+        with _clients_lock:
+            _clients.clear()
+
+
+def get_client(name):
+    """Return the process-wide client for provider ``name``, creating it on first use."""
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = HttpClient(name, **settings.OUTBOUND_HTTP.get(name, {}))
+        return _clients[name]
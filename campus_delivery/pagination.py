@@ -0,0 +1,29 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Keyset pagination on ``(created_at, id)``, newest first.
+
+    Each page is a range scan from the cursor position on the matching index,
+    so deep pages cost the same as the first one and no COUNT(*) is issued.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class AssignedAtCursorPagination(CreatedAtCursorPagination):
+    ordering = ('-assigned_at', '-id')
+
+
+class IdCursorPagination(CreatedAtCursorPagination):
+    # Oldest first, for clients catching up from the last id they saw.
+    ordering = ('id',)
+
+
+class SearchResultsPagination(PageNumberPagination):
+    # Ranked results are ordered by relevance, which a cursor can't key on.
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 50
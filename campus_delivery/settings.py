@@ -48,6 +48,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # Third-party apps
     'rest_framework',
     'allauth',
@@ -62,6 +63,7 @@ INSTALLED_APPS = [
     'products',
     'payment',
     'notifications',
+    'simulator',
     # Image-Upload
     'cloudinary',
     'cloudinary_storage' 
@@ -114,6 +116,34 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Local memory by default (per process, fine for development and tests); point
+# CACHE_BACKEND/CACHE_LOCATION at Redis in production so workers share state.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Shopping carts live in the cache rather than the DB-backed session. The
+# cache must be shared by all workers; a per-process one (LocMem) is refused
+# unless CART_CACHE_ALLOW_LOCAL (single-process runserver and tests).
+CART_CACHE_ALIAS = 'default'
+CART_CACHE_ALLOW_LOCAL = 'test' in sys.argv or os.getenv('CART_CACHE_ALLOW_LOCAL', str(DEBUG)) == 'True'
+CART_TIMEOUT = int(os.getenv('CART_TIMEOUT', 60 * 60 * 24 * 7))
+
+# Rendered product list responses; invalidated by bumping the catalog version.
+# Each process would keep its own version in a per-process cache (LocMem) and
+# serve stale lists after edits made through another worker, so list caching
+# is off there unless CATALOG_CACHE_ALLOW_LOCAL (single-process runserver).
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 60 * 10))
+CATALOG_CACHE_ALLOW_LOCAL = 'test' in sys.argv or os.getenv('CATALOG_CACHE_ALLOW_LOCAL', str(DEBUG)) == 'True'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -171,7 +201,9 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
-    )
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'campus_delivery.pagination.CreatedAtCursorPagination',
+    'PAGE_SIZE': 20,
 }
 
 # JWT Settings
@@ -199,6 +231,11 @@ MPESA_CONSUMER_SECRET = os.getenv('MPESA_CONSUMER_SECRET')
 MPESA_SHORT_CODE = os.getenv('MPESA_SHORT_CODE')
 MPESA_PASSKEY = os.getenv('MPESA_PASSKEY')
 MPESA_CALLBACK_URL = os.getenv('MPESA_CALLBACK_URL')
+MPESA_TOKEN_REFRESH_MARGIN = 60  # seconds before expiry to fetch a new OAuth token
+MPESA_API_BASE_URL = os.getenv('MPESA_API_BASE_URL', 'https://sandbox.safaricom.co.ke')
+# Queue STK pushes for `manage.py process_stk_pushes` and answer 202 instead of
+# calling Daraja inside the request
+MPESA_ASYNC_STK_PUSH = os.getenv('MPESA_ASYNC_STK_PUSH', 'False') == 'True'
 
 # Email Configuration
 if 'test' in sys.argv:
@@ -216,6 +253,87 @@ else:
 AT_USERNAME = os.getenv('AT_USERNAME')
 AT_API_KEY = os.getenv('AT_API_KEY')
 AT_SENDER_ID = os.getenv('AT_SENDER_ID')
+AT_API_BASE_URL = os.getenv(
+    'AT_API_BASE_URL',
+    'https://api.sandbox.africastalking.com' if AT_USERNAME == 'sandbox' else 'https://api.africastalking.com'
+)
+
+# Outbound HTTP clients (campus_delivery.http_client.get_client), per provider.
+# Timeouts are (connect, read) seconds, looked up by endpoint name.
+OUTBOUND_HTTP = {
+    'mpesa': {
+        'base_url': MPESA_API_BASE_URL,
+        'timeouts': {'default': (3.05, 10), 'oauth': (3.05, 5), 'stk_push': (3.05, 15), 'stk_query': (3.05, 10)},
+        'retries': 2,
+        'pool_size': 10,
+    },
+    'africastalking': {
+        'base_url': AT_API_BASE_URL,
+        'timeouts': {'default': (3.05, 10)},
+        'retries': 2,
+        'pool_size': 4,
+    },
+}
+
+# Notification outbox (delivered by `manage.py dispatch_notifications`)
+if 'test' in sys.argv:
+    NOTIFICATION_SMS_TRANSPORT = 'notifications.transports.FakeTransport'
+    NOTIFICATION_SMS_BATCH_WINDOW = 0
+else:
+    NOTIFICATION_SMS_TRANSPORT = os.getenv('NOTIFICATION_SMS_TRANSPORT', 'notifications.transports.AfricasTalkingTransport')
+    # Seconds an SMS waits in the outbox so identical messages can be sent in one
+    # request. Off by default: it delays every SMS, and only helps when the same
+    # text goes to many recipients (e.g. broadcasts)
+    NOTIFICATION_SMS_BATCH_WINDOW = float(os.getenv('NOTIFICATION_SMS_BATCH_WINDOW', 0))
+# Delivery status SMS within this many seconds of the first pending one are
+# merged into a single SMS carrying the latest status
+NOTIFICATION_DELIVERY_STATUS_SMS_WINDOW = float(os.getenv('NOTIFICATION_DELIVERY_STATUS_SMS_WINDOW', 60))
+NOTIFICATION_FAKE_TRANSPORT = {
+    'latency': float(os.getenv('NOTIFICATION_FAKE_LATENCY', 0)),
+    'failure_rate': float(os.getenv('NOTIFICATION_FAKE_FAILURE_RATE', 0)),
+}
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = 5
+NOTIFICATION_OUTBOX_RETRY_BASE = 30  # seconds
+NOTIFICATION_OUTBOX_RETRY_MAX = 60 * 60
+NOTIFICATION_OUTBOX_LEASE = 5 * 60  # seconds a claimed message is hidden from other dispatchers
+NOTIFICATION_REPLAY_LIMIT = 100  # missed notifications sent to a reconnecting websocket
+# Skip websocket pushes to users with no open socket. Presence is kept in the
+# default cache, so only enable it when that cache is shared (Redis): with the
+# per-process LocMem cache a worker never sees sockets held by other workers.
+NOTIFICATION_PRESENCE_ENABLED = os.getenv('NOTIFICATION_PRESENCE_ENABLED', 'False') == 'True'
+NOTIFICATION_PRESENCE_TIMEOUT = int(os.getenv('NOTIFICATION_PRESENCE_TIMEOUT', 60 * 60 * 24))
+# Days to keep notifications before `manage.py prune_notifications` removes them,
+# keyed by '<type>:<channel>' ('*' matches anything, most specific key wins,
+# None keeps rows forever)
+NOTIFICATION_RETENTION_DAYS = {
+    '*:*': 90,
+    '*:sms': 30,
+    'delivery_status:*': 14,
+    'payment_completed:*': 365,
+}
+
+# Automatic delivery dispatch (`manage.py dispatch_deliveries`)
+DELIVERY_MAX_OPEN_PER_RIDER = int(os.getenv('DELIVERY_MAX_OPEN_PER_RIDER', 3))
+DELIVERY_DISPATCH_INTERVAL = float(os.getenv('DELIVERY_DISPATCH_INTERVAL', 5))  # seconds between idle polls
+# Orders with the same pickup and drop zones placed within DELIVERY_ROUTE_WINDOW
+# seconds of each other are batched into one route of up to
+# DELIVERY_ROUTE_MAX_DROPS deliveries (1 disables batching)
+DELIVERY_ROUTE_MAX_DROPS = int(os.getenv('DELIVERY_ROUTE_MAX_DROPS', 3))
+DELIVERY_ROUTE_WINDOW = float(os.getenv('DELIVERY_ROUTE_WINDOW', 120))
+# Rider location socket: recent pings are kept in the default cache and
+# written to the location history in bulk every DELIVERY_TRACK_SAVE_INTERVAL
+# seconds (or once DELIVERY_TRACK_BUFFER_SIZE are waiting) and on disconnect
+DELIVERY_TRACK_BUFFER_SIZE = 50
+DELIVERY_TRACK_BUFFER_TIMEOUT = 60 * 60 * 6
+DELIVERY_TRACK_SAVE_INTERVAL = float(os.getenv('DELIVERY_TRACK_SAVE_INTERVAL', 30))
+DELIVERY_TRACK_MAX_POINTS = 500  # points returned by /deliveries/<id>/track/
+# `manage.py compact_locations` keeps one point per DELIVERY_TRACK_COMPACT_INTERVAL
+# seconds for history older than DELIVERY_TRACK_COMPACT_AFTER_DAYS. Each run only
+# goes back DELIVERY_TRACK_COMPACT_LOOKBACK_DAYS further (earlier history was
+# compacted by earlier runs); pass --since to compact older history once.
+DELIVERY_TRACK_COMPACT_AFTER_DAYS = int(os.getenv('DELIVERY_TRACK_COMPACT_AFTER_DAYS', 7))
+DELIVERY_TRACK_COMPACT_INTERVAL = int(os.getenv('DELIVERY_TRACK_COMPACT_INTERVAL', 60))
+DELIVERY_TRACK_COMPACT_LOOKBACK_DAYS = int(os.getenv('DELIVERY_TRACK_COMPACT_LOOKBACK_DAYS', 2))
 
 # CLoudinary Image upload
 cloudinary.config( 
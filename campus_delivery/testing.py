@@ -0,0 +1,27 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountAssertionsMixin:
+    """TestCase mixin for catching N+1 queries on list endpoints."""
+
+    def assertListQueriesConstant(self, url, add_rows, sizes=(1, 5)):
+        """Fail if the number of queries for ``GET url`` depends on how many rows it returns.
+
+        ``add_rows(n)`` must create ``n`` more rows visible to the authenticated
+        client. The endpoint is requested once per entry in ``sizes``, growing the
+        data between requests, and every request must issue the same number of queries.
+        """
+        counts = {}
+        current = 0
+        for size in sizes:
+            add_rows(size - current)
+            current = size
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts[size] = len(queries)
+        self.assertEqual(
+            len(set(counts.values())), 1,
+            f"Query count for {url} grows with the number of rows: {counts}"
+        )
@@ -47,7 +47,7 @@ class OrderAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         if request.user.role == 'vendor':
-            return qs.filter(orderitem__product__vendor=request.user).distinct()
+            return qs.filter(vendor_links__vendor=request.user)
         return qs
 
 @admin.register(OrderItem)
@@ -70,7 +70,7 @@ class PaymentAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         if request.user.role == 'vendor':
-            return qs.filter(order__orderitem__product__vendor=request.user).distinct()
+            return qs.filter(order__vendor_links__vendor=request.user)
         return qs
 
 @admin.register(Delivery)
@@ -86,7 +86,8 @@ class DeliveryAdmin(admin.ModelAdmin):
             return
         try:
             delivery_person = User.objects.get(id=request.POST['delivery_person_id'], role='delivery_person')
-            queryset.update(delivery_person=delivery_person)
+            # A reassigned delivery leaves its route, which stays with the old rider
+            queryset.update(delivery_person=delivery_person, route=None)
             self.message_user(request, f"Assigned {delivery_person.full_name} to selected deliveries.")
         except User.DoesNotExist:
             self.message_user(request, "Delivery person not found.")
@@ -95,7 +96,7 @@ class DeliveryAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         if request.user.role == 'vendor':
-            return qs.filter(order__orderitem__product__vendor=request.user).distinct()
+            return qs.filter(order__vendor_links__vendor=request.user)
         elif request.user.role == 'delivery_person':
             return qs.filter(delivery_person=request.user)
         return qs
@@ -105,6 +106,8 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ('id', 'recipient', 'type', 'channel', 'phone_number', 'status', 'created_at')
     list_filter = ('type', 'channel', 'status', 'created_at')
     search_fields = ('recipient__full_name', 'phone_number', 'message')
+    list_select_related = ('recipient',)
+    show_full_result_count = False  # skip the unfiltered COUNT(*) on a large table
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
@@ -134,7 +137,7 @@ class ComplaintAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         if request.user.role == 'vendor':
-            return qs.filter(order__orderitem__product__vendor=request.user).distinct()
+            return qs.filter(order__vendor_links__vendor=request.user)
         elif request.user.role == 'customer':
             return qs.filter(user=request.user)
         return qs
@@ -165,10 +168,11 @@ class CampusAdminSite(admin.AdminSite):
                 'orders_by_status': Order.objects.values('status').annotate(count=Count('id')),
             }
         elif request.user.role == 'vendor':
+            vendor_orders = Order.objects.filter(vendor_links__vendor=request.user)
             extra_context['analytics'] = {
                 'total_products': Product.objects.filter(vendor=request.user).count(),
-                'total_orders': Order.objects.filter(orderitem__product__vendor=request.user).count(),
-                'total_revenue': Order.objects.filter(orderitem__product__vendor=request.user).aggregate(total=Sum('total_price'))['total'] or 0,
+                'total_orders': vendor_orders.count(),
+                'total_revenue': vendor_orders.aggregate(total=Sum('total_price'))['total'] or 0,
             }
         return super().index(request, extra_context)
 
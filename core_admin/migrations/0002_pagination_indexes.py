@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-17 03:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core_admin", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="complaint",
+            index=models.Index(
+                fields=["created_at", "id"], name="complaint_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="complaint",
+            index=models.Index(
+                fields=["user", "created_at", "id"],
+                name="complaint_user_created_id_idx",
+            ),
+        ),
+    ]
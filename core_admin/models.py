@@ -1,6 +1,12 @@
 from django.db import models
 from users.models import User
-from orders.models import Order
+from orders.models import Order, order_items_prefetch
+
+class ComplaintQuerySet(models.QuerySet):
+    def with_order(self):
+        return self.select_related('order__customer').prefetch_related(
+            order_items_prefetch('order__items')
+        )
 
 class Complaint(models.Model):
     STATUS_CHOICES = (
@@ -15,5 +21,13 @@ class Complaint(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ComplaintQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='complaint_created_id_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='complaint_user_created_id_idx'),
+        ]
+
     def __str__(self):
         return f"Complaint #{self.id} by {self.user.full_name} for Order #{self.order.id}"
\ No newline at end of file
@@ -20,6 +20,7 @@ class ComplaintCreateSerializer(serializers.ModelSerializer):
 
 class AnalyticsSerializer(serializers.Serializer):
     total_users = serializers.IntegerField()
+    total_products = serializers.IntegerField(required=False)
     total_orders = serializers.IntegerField()
     total_revenue = serializers.FloatField()
     orders_by_status = serializers.ListField(child=serializers.DictField())
\ No newline at end of file
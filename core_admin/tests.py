@@ -2,12 +2,13 @@ from django.test import TestCase
 from rest_framework.test import APIClient
 from users.models import User
 from products.models import Product
-from orders.models import Order
+from orders.models import Order, OrderItem
 from .models import Complaint
 from notifications.models import Notification
 from django.urls import reverse
+from campus_delivery.testing import QueryCountAssertionsMixin
 
-class AdminTests(TestCase):
+class AdminTests(QueryCountAssertionsMixin, TestCase):
     def setUp(self):
         self.client = APIClient()
         self.admin = User.objects.create_user(
@@ -64,7 +65,7 @@ class AdminTests(TestCase):
         self.client.force_authenticate(user=self.vendor)
         response = self.client.get(reverse('complaint-list'))
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_resolve_complaint(self):
         complaint = Complaint.objects.create(user=self.customer, order=self.order, description='Test complaint')
@@ -93,4 +94,12 @@ class AdminTests(TestCase):
         self.assertIn('total_orders', response.data)
         self.assertIn('total_revenue', response.data)
         self.assertIn('orders_by_status', response.data)
-        self.assertEqual(response.data['total_users'], 0)
\ No newline at end of file
+        self.assertEqual(response.data['total_users'], 0)
+
+    def test_complaint_list_query_count(self):
+        def add_complaints(count):
+            for _ in range(count):
+                order = Order.objects.create(customer=self.customer, total_price=20.00)
+                OrderItem.objects.create(order=order, product=self.product, quantity=2)
+                Complaint.objects.create(user=self.customer, order=order, description='Late delivery')
+        self.assertListQueriesConstant(reverse('complaint-list'), add_complaints)
@@ -7,6 +7,7 @@ from .models import Complaint
 from .serializers import ComplaintSerializer, ComplaintCreateSerializer, AnalyticsSerializer
 from users.models import User
 from orders.models import Order
+from products.models import Product
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -24,11 +25,12 @@ class ComplaintListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
+        queryset = Complaint.objects.with_order()
         if self.request.user.role == 'admin':
-            return Complaint.objects.all()
+            return queryset
         elif self.request.user.role == 'vendor':
-            return Complaint.objects.filter(order__orderitem__product__vendor=self.request.user).distinct()
-        return Complaint.objects.filter(user=self.request.user)
+            return queryset.filter(order__vendor_links__vendor=self.request.user)
+        return queryset.filter(user=self.request.user)
 
 class ComplaintResolveView(generics.UpdateAPIView):
     queryset = Complaint.objects.all()
@@ -55,12 +57,13 @@ class AnalyticsView(APIView):
                 'orders_by_status': list(Order.objects.values('status').annotate(count=Count('id'))),
             }
         elif request.user.role == 'vendor':
+            vendor_orders = Order.objects.filter(vendor_links__vendor=request.user)
             data = {
                 'total_users': 0,  # Vendors don't see user counts
                 'total_products': Product.objects.filter(vendor=request.user).count(),
-                'total_orders': Order.objects.filter(orderitem__product__vendor=request.user).count(),
-                'total_revenue': Order.objects.filter(orderitem__product__vendor=request.user).aggregate(total=Sum('total_price'))['total'] or 0,
-                'orders_by_status': list(Order.objects.filter(orderitem__product__vendor=request.user).values('status').annotate(count=Count('id'))),
+                'total_orders': vendor_orders.count(),
+                'total_revenue': vendor_orders.aggregate(total=Sum('total_price'))['total'] or 0,
+                'orders_by_status': list(vendor_orders.values('status').annotate(count=Count('id'))),
             }
         else:
             return Response({"detail": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
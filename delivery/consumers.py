@@ -0,0 +1,66 @@
+import json
+import time
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from .models import Delivery
+from .tracking import parse_ping, record_ping, save_pings
+
+
+class RiderLocationConsumer(AsyncWebsocketConsumer):
+    """Streams a rider's position for one delivery to the order's customer.
+
+    Each ``{"lat": .., "lng": ..}`` message goes into the cache ring buffer
+    and is pushed to the customer's notification socket as a
+    ``rider_location`` message. Pings are written to the location history in
+    batches: every ``DELIVERY_TRACK_SAVE_INTERVAL`` seconds, whenever
+    ``DELIVERY_TRACK_BUFFER_SIZE`` are waiting, and on disconnect.
+    """
+
+    async def connect(self):
+        user = self.scope['user']
+        self.delivery = None
+        if not user.is_anonymous:
+            self.delivery = await self.get_delivery(self.scope['url_route']['kwargs']['delivery_id'], user)
+        if self.delivery is None:
+            await self.close()
+            return
+        self.last_saved = time.monotonic()
+        self.unsaved = []
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if self.delivery is not None:
+            await self.save()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            ping = parse_ping(json.loads(text_data or ''))
+        except ValueError as e:  # includes malformed JSON
+            await self.send(text_data=json.dumps({'type': 'error', 'detail': str(e)}))
+            return
+        await record_ping(self.delivery.id, ping)
+        await self.channel_layer.group_send(f"user_{self.delivery.order.customer_id}", {
+            'type': 'send_notification',
+            'message': {'type': 'rider_location', 'delivery_id': self.delivery.id, 'order_id': self.delivery.order_id, **ping},
+        })
+        self.unsaved.append(ping)
+        if (
+            time.monotonic() - self.last_saved >= settings.DELIVERY_TRACK_SAVE_INTERVAL
+            or len(self.unsaved) >= settings.DELIVERY_TRACK_BUFFER_SIZE
+        ):
+            await self.save()
+
+    async def save(self):
+        pings, self.unsaved = self.unsaved, []
+        self.last_saved = time.monotonic()
+        await database_sync_to_async(save_pings)(self.delivery.id, pings)
+
+    @database_sync_to_async
+    def get_delivery(self, delivery_id, user):
+        # Only the assigned rider can stream, and only while the delivery is open.
+        return (
+            Delivery.objects.select_related('order')
+            .filter(pk=delivery_id, delivery_person=user, status__in=Delivery.OPEN_STATUSES)
+            .first()
+        )
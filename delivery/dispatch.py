@@ -0,0 +1,158 @@
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef
+from django.utils import timezone
+from notifications.services import NotificationBatch, add_delivery_assigned
+from orders.models import Order, order_items_prefetch
+from payment.models import Payment
+from users.models import User
+from .models import Delivery, DeliveryRoute
+from .zones import zone_of
+
+
+def undispatched_orders():
+    """Paid, in-progress orders that have no delivery yet, oldest first."""
+    return (
+        Order.objects.filter(status='in_progress')
+        .filter(Exists(Payment.objects.filter(order=OuterRef('pk'), status='completed')))
+        .exclude(Exists(Delivery.objects.filter(order=OuterRef('pk'))))
+        .order_by('created_at', 'id')
+    )
+
+
+def pickup_zone(order):
+    # Orders are picked up from their vendor; the first item's vendor decides.
+    items = order.items.all()
+    return zone_of(items[0].product.vendor.location) if items else ''
+
+
+def route_groups(orders, window, max_drops):
+    """Split ``orders`` (oldest first) into groups one rider can carry in one trip.
+
+    Orders join a group when they share its pickup and drop zones, were
+    placed within ``window`` of the group's first order, and the group has
+    fewer than ``max_drops`` orders. Returns ``[(drop zone, [orders])]``.
+    """
+    groups = []
+    open_groups = {}
+    for order in orders:
+        key = (pickup_zone(order), zone_of(order.customer.location))
+        group = open_groups.get(key)
+        if group is None or len(group) >= max_drops or order.created_at - group[0].created_at > window:
+            group = open_groups[key] = []
+            groups.append((key[1], group))
+        group.append(order)
+    return groups
+
+
+class RiderPool:
+    """Riders with spare capacity, keyed by load, overall and per campus zone.
+
+    Heaps hold ``(open deliveries, rider id)`` entries; an entry whose load no
+    longer matches the rider's current load is stale and skipped, so taking a
+    rider is O(log riders) whichever heap it came from.
+    """
+
+    def __init__(self, riders, loads, max_open):
+        self.riders = {rider.id: rider for rider in riders}
+        self.zones = {rider.id: zone_of(rider.location) for rider in riders}
+        self.loads = {rider.id: loads.get(rider.id, 0) for rider in riders}
+        self.max_open = max_open
+        self.everyone = []
+        self.by_zone = defaultdict(list)
+        for rider_id in self.riders:
+            self.push(rider_id)
+
+    def push(self, rider_id):
+        if self.loads[rider_id] < self.max_open:
+            entry = (self.loads[rider_id], rider_id)
+            heapq.heappush(self.everyone, entry)
+            heapq.heappush(self.by_zone[self.zones[rider_id]], entry)
+
+    def least_loaded(self, heap):
+        while heap and heap[0][0] != self.loads[heap[0][1]]:
+            heapq.heappop(heap)
+        return heap[0][1] if heap else None
+
+    def take(self, zone, size=1):
+        """Give ``size`` deliveries to the least-loaded rider in ``zone`` with room for them,
+        else to the least-loaded rider anywhere; returns the rider or ``None``.
+        """
+        for heap in (self.by_zone.get(zone) if zone else None, self.everyone):
+            rider_id = self.least_loaded(heap) if heap else None
+            if rider_id is not None and self.loads[rider_id] + size <= self.max_open:
+                # The rider's old entries go stale with the new load.
+                self.loads[rider_id] += size
+                self.push(rider_id)
+                return self.riders[rider_id]
+        return None
+
+
+def open_delivery_counts(rider_ids):
+    counts = (
+        Delivery.objects.filter(status__in=Delivery.OPEN_STATUSES, delivery_person__in=rider_ids)
+        .values('delivery_person').annotate(open=Count('id')).values_list('delivery_person', 'open')
+    )
+    return dict(counts)
+
+
+def dispatch_deliveries(batch_size=500, max_open=None, max_drops=None, now=None):
+    """Assign riders to up to ``batch_size`` undispatched orders; returns the deliveries created.
+
+    Orders are first grouped into multi-drop routes (see ``route_groups``,
+    at most ``max_drops`` per route). A group that is not yet full waits
+    until its first order is ``DELIVERY_ROUTE_WINDOW`` seconds old, so later
+    orders for the same zones can join it. Each group goes to the
+    least-loaded active rider in the customers' zone (from
+    ``User.location``), falling back to the least-loaded rider anywhere, and
+    no rider is given more than ``max_open`` open deliveries. The whole
+    batch - routes, deliveries and their notifications - is written in one
+    transaction with bulk inserts. Orders and riders are claimed with
+    ``SKIP LOCKED`` so concurrent dispatchers neither assign the same order
+    twice nor push a rider past ``max_open``.
+    """
+    if max_open is None:
+        max_open = settings.DELIVERY_MAX_OPEN_PER_RIDER
+    if max_drops is None:
+        max_drops = settings.DELIVERY_ROUTE_MAX_DROPS
+    max_drops = min(max_drops, max_open)
+    now = now or timezone.now()
+    with transaction.atomic():
+        orders = list(
+            undispatched_orders().select_for_update(skip_locked=True, of=('self',))
+            .select_related('customer').prefetch_related(order_items_prefetch())[:batch_size]
+        )
+        if not orders:
+            return []
+        # Riders are locked before their loads are counted, so a concurrent
+        # dispatcher either skips them or sees the deliveries committed here.
+        riders = list(
+            User.objects.filter(role='delivery_person', is_active=True)
+            .select_for_update(skip_locked=True).only('id', 'full_name', 'phone', 'location')
+        )
+        pool = RiderPool(riders, open_delivery_counts([rider.id for rider in riders]), max_open)
+        window = timedelta(seconds=settings.DELIVERY_ROUTE_WINDOW)
+        assignments = []
+        for zone, group in route_groups(orders, window, max_drops):
+            if len(group) < max_drops and now - group[0].created_at < window:
+                continue  # still open for more orders
+            rider = pool.take(zone, len(group))
+            if rider is not None:
+                assignments.append((rider, group))
+        routes = DeliveryRoute.objects.bulk_create(
+            DeliveryRoute(delivery_person=rider) for rider, group in assignments if len(group) > 1
+        )
+        routes = iter(routes)
+        deliveries = []
+        for rider, group in assignments:
+            route = next(routes) if len(group) > 1 else None
+            deliveries.extend(Delivery(order=order, delivery_person=rider, route=route) for order in group)
+        Delivery.objects.bulk_create(deliveries)
+        batch = NotificationBatch()
+        for delivery in deliveries:
+            add_delivery_assigned(batch, delivery)
+        batch.save()
+    return deliveries
@@ -0,0 +1,74 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from delivery.dispatch import dispatch_deliveries
+from delivery.zones import zone_of
+from orders.models import Order
+from payment.models import Payment
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Time automatic dispatch of a backlog of paid orders across many riders. "
+        "Runs inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=5000)
+        parser.add_argument('--riders', type=int, default=300)
+        parser.add_argument('--zones', type=int, default=12)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-open', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        zones = [f"Zone {i}" for i in range(options['zones'])]
+        with transaction.atomic():
+            self.seed(rng, zones, options['orders'], options['riders'])
+            self.stdout.write(f"{options['orders']} paid orders, {options['riders']} riders, {len(zones)} zones")
+            batches = []
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                while True:
+                    batch_start = time.perf_counter()
+                    deliveries = dispatch_deliveries(options['batch_size'], options['max_open'])
+                    if not deliveries:
+                        break
+                    batches.append(((time.perf_counter() - batch_start) * 1000, deliveries))
+                elapsed = time.perf_counter() - start
+            assigned = sum(len(deliveries) for _, deliveries in batches)
+            same_zone = sum(
+                zone_of(delivery.order.customer.location) == zone_of(delivery.delivery_person.location)
+                for _, deliveries in batches for delivery in deliveries
+            )
+            timings = sorted(ms for ms, _ in batches)
+            self.stdout.write(
+                f"assigned={assigned} in {len(batches)} batches, {elapsed:.2f}s ({assigned / elapsed if elapsed else 0:.0f}/s), "
+                f"same zone {same_zone / assigned if assigned else 0:.1%}, {len(queries)} queries"
+            )
+            if timings:
+                self.stdout.write(
+                    f"per batch: median={timings[len(timings) // 2]:.1f}ms  max={timings[-1]:.1f}ms"
+                )
+            transaction.set_rollback(True)
+
+    def seed(self, rng, zones, order_count, rider_count):
+        def user(i, role):
+            return User(
+                username=f'bench-{role}-{i}@example.com', email=f'bench-{role}-{i}@example.com',
+                full_name=f'Bench {role} {i}', phone=f'bench-{role[0]}-{i:05}', role=role,
+                location=f"{rng.choice(zones)}, Room {i}",
+            )
+
+        User.objects.bulk_create(user(i, 'delivery_person') for i in range(rider_count))
+        customers = User.objects.bulk_create(user(i, 'customer') for i in range(order_count // 5 or 1))
+        orders = Order.objects.bulk_create(
+            Order(customer=rng.choice(customers), total_price=100) for _ in range(order_count)
+        )
+        Payment.objects.bulk_create(
+            Payment(order=order, amount=100, status='completed', mpesa_code=f'BENCH{order.id}') for order in orders
+        )
@@ -0,0 +1,67 @@
+import argparse
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from delivery.models import DeliveryLocation
+from delivery.tracking import compact_track
+
+
+def aware_datetime(value):
+    """argparse type for ``--since``: an ISO date or datetime, in the current time zone if naive."""
+    parsed = parse_datetime(value) or parse_datetime(f"{value}T00:00")
+    if parsed is None:
+        raise argparse.ArgumentTypeError(f"invalid date: {value!r}")
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+def floor_to_interval(value, interval):
+    """Round ``value`` down to a multiple of ``interval`` seconds since the epoch, like compaction buckets."""
+    return datetime.fromtimestamp(value.timestamp() // interval * interval, tz=dt_timezone.utc)
+
+
+class Command(BaseCommand):
+    help = (
+        "Downsample rider location history older than DELIVERY_TRACK_COMPACT_AFTER_DAYS "
+        "to one point per delivery per DELIVERY_TRACK_COMPACT_INTERVAL seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, help="Days of full-resolution history to keep.")
+        parser.add_argument('--interval', type=int, help="Seconds per kept point.")
+        parser.add_argument(
+            '--since', type=aware_datetime,
+            help="Compact history from this date (default DELIVERY_TRACK_COMPACT_LOOKBACK_DAYS before the cutoff)."
+        )
+        parser.add_argument('--chunk-hours', type=float, default=6, help="Time range compacted per statement.")
+        parser.add_argument('--sleep', type=float, default=0, help="Seconds to pause between chunks.")
+
+    def handle(self, *args, **options):
+        days = options['older_than'] if options['older_than'] is not None else settings.DELIVERY_TRACK_COMPACT_AFTER_DAYS
+        interval = options['interval'] or settings.DELIVERY_TRACK_COMPACT_INTERVAL
+        # Chunk edges fall on bucket edges, so no bucket is split between two DELETEs
+        cutoff = floor_to_interval(timezone.now() - timedelta(days=days), interval)
+        since = options['since'] or cutoff - timedelta(days=settings.DELIVERY_TRACK_COMPACT_LOOKBACK_DAYS)
+        start = (
+            DeliveryLocation.objects.filter(recorded_at__gte=since, recorded_at__lt=cutoff)
+            .aggregate(start=Min('recorded_at'))['start']
+        )
+        if start is not None:
+            start = floor_to_interval(start, interval)
+        chunk = timedelta(seconds=max(options['chunk_hours'] * 3600 // interval, 1) * interval)
+        total = 0
+        began = time.monotonic()
+        # Each chunk is a short DELETE over a time range the BRIN index narrows down.
+        while start is not None and start < cutoff:
+            end = min(start + chunk, cutoff)
+            total += compact_track(start, end, interval)
+            start = end
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        elapsed = time.monotonic() - began
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {total} location points older than {days} days in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,27 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from delivery.dispatch import dispatch_deliveries
+
+
+class Command(BaseCommand):
+    help = "Assign riders to paid orders that have no delivery yet, by campus zone and rider load."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=float, help="Seconds to sleep when nothing was assigned.")
+        parser.add_argument('--once', action='store_true', help="Process a single batch and exit.")
+        parser.add_argument('--drain', action='store_true', help="Process batches until nothing is assigned, then exit.")
+
+    def handle(self, *args, **options):
+        interval = options['interval'] if options['interval'] is not None else settings.DELIVERY_DISPATCH_INTERVAL
+        total = 0
+        start = time.monotonic()
+        while True:
+            assigned = len(dispatch_deliveries(options['batch_size']))
+            total += assigned
+            if options['once'] or (options['drain'] and not assigned):
+                break
+            if not assigned:
+                time.sleep(interval)
+        self.stdout.write(f"Assigned {total} deliveries in {time.monotonic() - start:.2f}s")
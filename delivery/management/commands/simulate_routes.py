@@ -0,0 +1,181 @@
+import heapq
+import random
+import statistics
+from collections import defaultdict, deque
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+from delivery.dispatch import dispatch_deliveries, undispatched_orders
+from delivery.models import Delivery, DeliveryRoute
+from delivery.zones import zone_of
+from orders.models import Order, OrderItem
+from payment.models import Payment
+from products.models import Product
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate a peak period with the real dispatcher and compare deliveries per rider-hour "
+        "with and without multi-drop routes. Runs inside transactions that are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=2)
+        parser.add_argument('--orders-per-hour', type=float, default=120)
+        parser.add_argument('--riders', type=int, default=20)
+        parser.add_argument('--zones', type=int, default=4, help="Drop zones (hostel blocks).")
+        parser.add_argument('--pickup-zones', type=int, default=2)
+        parser.add_argument('--vendors', type=int, default=8)
+        parser.add_argument('--max-drops', type=int, default=3)
+        parser.add_argument('--window', type=float, help="Seconds a route waits for more orders (default DELIVERY_ROUTE_WINDOW).")
+        parser.add_argument('--max-open', type=int, default=3)
+        parser.add_argument('--tick', type=float, default=30, help="Simulated seconds between dispatcher runs.")
+        parser.add_argument('--hop-minutes', type=float, default=8, help="Walk between two zones.")
+        parser.add_argument('--in-zone-minutes', type=float, default=2, help="Walk within a zone.")
+        parser.add_argument('--pickup-minutes', type=float, default=3)
+        parser.add_argument('--drop-minutes', type=float, default=2)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.stdout.write(
+            f"{options['hours']}h at {options['orders_per_hour']:.0f} orders/h, {options['riders']} riders, "
+            f"{options['zones']} drop zones, {options['pickup_zones']} pickup zones"
+        )
+        window = settings.DELIVERY_ROUTE_WINDOW if options['window'] is None else options['window']
+        for max_drops in (1, options['max_drops']):
+            with transaction.atomic(), override_settings(DELIVERY_ROUTE_WINDOW=window):
+                self.run(max_drops)
+                transaction.set_rollback(True)
+
+    def seed(self, rng):
+        options = self.options
+        zones = [f"Zone {i}" for i in range(options['zones'])]
+        # Keep existing riders and waiting orders out of the simulation (rolled back afterwards).
+        User.objects.filter(role='delivery_person').update(is_active=False)
+        Order.objects.filter(pk__in=undispatched_orders().values('pk')).update(status='cancelled')
+
+        def users(role, count, location):
+            return User.objects.bulk_create(
+                User(
+                    username=f'sim-{role}-{i}@example.com', email=f'sim-{role}-{i}@example.com',
+                    full_name=f'Sim {role} {i}', phone=f'sim-{role[0]}-{i:05}', role=role, location=location(i),
+                )
+                for i in range(count)
+            )
+
+        users('delivery_person', options['riders'], lambda i: rng.choice(zones))
+        customers = users('customer', options['zones'] * 20, lambda i: f"{rng.choice(zones)}, Room {i}")
+        vendors = users('vendor', options['vendors'], lambda i: f"Pickup {i % options['pickup_zones']}, Shop {i}")
+        products = Product.objects.bulk_create(
+            Product(vendor=vendor, name=f'Sim product {vendor.id}', price=100, quantity=10 ** 6, type='tangible', category='vegetable')
+            for vendor in vendors
+        )
+        return customers, products
+
+    def arrivals(self, rng, customers, products):
+        # Poisson arrivals over the whole period, identical for every run.
+        t, rate, end = 0.0, self.options['orders_per_hour'] / 3600, self.options['hours'] * 3600
+        arrivals = []
+        while True:
+            t += rng.expovariate(rate)
+            if t >= end:
+                return arrivals
+            arrivals.append((t, rng.choice(customers), rng.choice(products)))
+
+    def place(self, base, batch):
+        orders = Order.objects.bulk_create(Order(customer=customer, total_price=100) for _, customer, _ in batch)
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product, quantity=1) for order, (_, _, product) in zip(orders, batch)
+        )
+        Payment.objects.bulk_create(
+            Payment(order=order, amount=100, status='completed', mpesa_code=f'SIM{order.id}') for order in orders
+        )
+        for order, (t, _, _) in zip(orders, batch):
+            # created_at is auto_now_add; move it to the simulated arrival time
+            Order.objects.filter(pk=order.pk).update(created_at=base + timedelta(seconds=t))
+        return {order.id: t for order, (t, _, _) in zip(orders, batch)}
+
+    def trip_seconds(self, position, deliveries):
+        # Walk to the vendor, pick everything up, walk to the block, then drop door to door.
+        options = self.options
+        walk = lambda a, b: options['in_zone_minutes'] if a == b else options['hop_minutes']
+        pickup = zone_of(deliveries[0].order.items.all()[0].product.vendor.location)
+        drop = zone_of(deliveries[0].order.customer.location)
+        minutes = (
+            walk(position, pickup) + options['pickup_minutes'] + walk(pickup, drop)
+            + options['drop_minutes'] * len(deliveries) + options['in_zone_minutes'] * (len(deliveries) - 1)
+        )
+        return minutes * 60, drop
+
+    def run(self, max_drops):
+        options = self.options
+        rng = random.Random(options['seed'])
+        customers, products = self.seed(rng)
+        pending = deque(self.arrivals(rng, customers, products))
+        end = options['hours'] * 3600
+        base = timezone.now()
+        placed_at = {}
+        queues = defaultdict(deque)  # rider id -> trips waiting, as (ready at, [deliveries])
+        free_at = defaultdict(float)
+        position = {}
+        finishing = []  # heap of (done at, tie-breaker, [delivery ids], [placed at])
+        latencies = []
+        trips = delivered = 0
+        t = 0.0
+        while t <= end:
+            batch = []
+            while pending and pending[0][0] <= t:
+                batch.append(pending.popleft())
+            if batch:
+                placed_at.update(self.place(base, batch))
+
+            deliveries = dispatch_deliveries(
+                max_open=options['max_open'], max_drops=max_drops, now=base + timedelta(seconds=t)
+            )
+            if deliveries:
+                deliveries = Delivery.objects.filter(pk__in=[delivery.pk for delivery in deliveries]).select_related(
+                    'order__customer', 'delivery_person'
+                ).prefetch_related('order__items__product__vendor').order_by('id')
+                by_trip = defaultdict(list)
+                for delivery in deliveries:
+                    by_trip[(delivery.delivery_person_id, delivery.route_id or -delivery.id)].append(delivery)
+                for (rider_id, _), trip in by_trip.items():
+                    position.setdefault(rider_id, zone_of(trip[0].delivery_person.location))
+                    queues[rider_id].append((t, trip))
+
+            for rider_id, queue in queues.items():
+                while queue and free_at[rider_id] <= t:
+                    ready, trip = queue.popleft()
+                    seconds, position[rider_id] = self.trip_seconds(position[rider_id], trip)
+                    free_at[rider_id] = max(free_at[rider_id], ready) + seconds
+                    trips += 1
+                    heapq.heappush(finishing, (
+                        free_at[rider_id], trips, [delivery.pk for delivery in trip],
+                        [placed_at[delivery.order_id] for delivery in trip]
+                    ))
+
+            done = []
+            while finishing and finishing[0][0] <= t:
+                done_at, _, ids, placed = heapq.heappop(finishing)
+                done.extend(ids)
+                latencies.extend(done_at - p for p in placed)
+            if done:
+                # Frees the riders' capacity for the next dispatcher run.
+                Delivery.objects.filter(pk__in=done).update(status='delivered')
+                delivered += len(done)
+            t += options['tick']
+
+        routes = DeliveryRoute.objects.count()
+        label = "single drops" if max_drops == 1 else f"routes (max {max_drops} drops, {settings.DELIVERY_ROUTE_WINDOW:.0f}s window)"
+        latencies.sort()
+        p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)] if latencies else 0
+        self.stdout.write(
+            f"{label}: placed={len(placed_at)} delivered={delivered} trips={trips} routes={routes}  "
+            f"{delivered / (options['riders'] * options['hours']):.2f} deliveries/rider-hour  "
+            f"order-to-door median={statistics.median(latencies) / 60 if latencies else 0:.1f}min p95={p95 / 60:.1f}min"
+        )
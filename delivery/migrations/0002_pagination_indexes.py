@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-17 03:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("delivery", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="delivery",
+            index=models.Index(
+                fields=["assigned_at", "id"], name="delivery_assigned_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="delivery",
+            index=models.Index(
+                fields=["delivery_person", "assigned_at", "id"],
+                name="delivery_person_assigned_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-17 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("delivery", "0002_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="delivery",
+            index=models.Index(
+                condition=models.Q(
+                    ("status__in", ("pending", "picked_up", "in_transit"))
+                ),
+                fields=["delivery_person"],
+                name="delivery_open_person_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-17 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("delivery", "0003_open_delivery_person_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="delivery",
+            name="latitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="delivery",
+            name="located_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="delivery",
+            name="longitude",
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
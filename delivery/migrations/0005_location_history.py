@@ -0,0 +1,52 @@
+# Generated by Django 4.2 on 2026-10-17 03:57
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("delivery", "0004_rider_position"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeliveryLocation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("latitude", models.FloatField()),
+                ("longitude", models.FloatField()),
+                ("recorded_at", models.DateTimeField()),
+                (
+                    "delivery",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="locations",
+                        to="delivery.delivery",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="deliverylocation",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["recorded_at"], name="delivery_location_time_brin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="deliverylocation",
+            index=models.Index(
+                fields=["delivery", "recorded_at"], name="delivery_location_track_idx"
+            ),
+        ),
+    ]
@@ -1,6 +1,13 @@
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
 from users.models import User
-from orders.models import Order
+from orders.models import Order, order_items_prefetch
+
+class DeliveryQuerySet(models.QuerySet):
+    def with_order(self):
+        return self.select_related('order__customer').prefetch_related(
+            order_items_prefetch('order__items')
+        )
 
 class Delivery(models.Model):
     STATUS_CHOICES = (
@@ -10,13 +17,64 @@ class Delivery(models.Model):
         ('delivered', 'Delivered'),
         ('cancelled', 'Cancelled'),
     )
+    OPEN_STATUSES = ('pending', 'picked_up', 'in_transit')
+    # Status changes the customer is told about
+    NOTIFY_STATUSES = ('picked_up', 'in_transit', 'delivered', 'cancelled')
 
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='deliveries')
     delivery_person = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='deliveries')
+    # Set when the dispatcher batches this delivery with others for the same rider
+    route = models.ForeignKey('DeliveryRoute', on_delete=models.SET_NULL, null=True, blank=True, related_name='deliveries')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     location = models.CharField(max_length=255, blank=True)  # Optional for tracking
+    # Last rider position saved from the location socket (see delivery.tracking)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    located_at = models.DateTimeField(null=True, blank=True)
     assigned_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = DeliveryQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['assigned_at', 'id'], name='delivery_assigned_id_idx'),
+            models.Index(fields=['delivery_person', 'assigned_at', 'id'], name='delivery_person_assigned_idx'),
+            # Rider load for the dispatcher: open deliveries per rider
+            models.Index(
+                fields=['delivery_person'], condition=models.Q(status__in=('pending', 'picked_up', 'in_transit')),
+                name='delivery_open_person_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Delivery {self.id} for Order {self.order.id} ({self.status})"
+
+class DeliveryRoute(models.Model):
+    """Several deliveries with the same pickup and drop zones, carried by one rider in one trip."""
+    delivery_person = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='routes')
+    status = models.CharField(max_length=20, choices=Delivery.STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Route {self.id} ({self.status})"
+
+class DeliveryLocation(models.Model):
+    """Append-only history of rider positions, written in batches by the location socket."""
+    # Covered by delivery_location_track_idx, so no separate FK index
+    delivery = models.ForeignKey(Delivery, on_delete=models.CASCADE, related_name='locations', db_index=False)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Rows arrive in time order, so a BRIN index stays tiny and still
+            # narrows compaction's time-range scans to the right pages.
+            BrinIndex(fields=['recorded_at'], name='delivery_location_time_brin'),
+            models.Index(fields=['delivery', 'recorded_at'], name='delivery_location_track_idx'),
+        ]
+
     def __str__(self):
-        return f"Delivery {self.id} for Order {self.order.id} ({self.status})"
\ No newline at end of file
+        return f"Delivery {self.delivery_id} at ({self.latitude}, {self.longitude}) {self.recorded_at}"
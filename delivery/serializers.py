@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Delivery
+from .models import Delivery, DeliveryRoute
 from orders.serializers import OrderSerializer
 from users.models import User
 
@@ -9,8 +9,11 @@ class DeliverySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Delivery
-        fields = ['id', 'order', 'delivery_person', 'status', 'location', 'assigned_at', 'updated_at']
-        read_only_fields = ['id', 'assigned_at', 'updated_at']
+        fields = [
+            'id', 'order', 'delivery_person', 'route', 'status', 'location', 'latitude', 'longitude', 'located_at',
+            'assigned_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'route', 'latitude', 'longitude', 'located_at', 'assigned_at', 'updated_at']
 
 class DeliveryAssignSerializer(serializers.Serializer):
     order_id = serializers.IntegerField()
@@ -24,4 +27,11 @@ class DeliveryStatusSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'status': {'required': True},
             'location': {'required': False}
-        }
\ No newline at end of file
+        }
+
+class DeliveryRouteSerializer(serializers.ModelSerializer):
+    deliveries = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    class Meta:
+        model = DeliveryRoute
+        fields = ['id', 'delivery_person', 'status', 'deliveries', 'created_at', 'updated_at']
@@ -1,11 +1,27 @@
-from django.test import TestCase
+import threading
+from io import StringIO
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from campus_delivery.asgi import application
 from rest_framework.test import APIClient
 from users.models import User
 from orders.models import Order
 from products.models import Product
-from .models import Delivery
+from orders.models import OrderItem
+from notifications.models import Notification
+from payment.models import Payment
+from campus_delivery.testing import QueryCountAssertionsMixin
+from .dispatch import dispatch_deliveries
+from .models import Delivery, DeliveryLocation, DeliveryRoute
+from .tracking import compact_track, track_key
 
-class DeliveryTests(TestCase):
+class DeliveryTests(QueryCountAssertionsMixin, TestCase):
     def setUp(self):
         self.client = APIClient()
         self.admin = User.objects.create_user(
@@ -89,4 +105,226 @@ class DeliveryTests(TestCase):
             'order_id': self.order.id,
             'delivery_person_id': self.delivery_person.id
         })
-        self.assertEqual(response.status_code, 403)
\ No newline at end of file
+        self.assertEqual(response.status_code, 403)
+
+    def test_delivery_list_query_count(self):
+        def add_deliveries(count):
+            for _ in range(count):
+                order = Order.objects.create(customer=self.customer, total_price=20.00)
+                OrderItem.objects.create(order=order, product=self.product, quantity=2)
+                Delivery.objects.create(order=order, delivery_person=self.delivery_person)
+        self.assertListQueriesConstant('/api/deliveries/', add_deliveries)
+
+    def test_dispatch_prefers_same_zone_and_caps_rider_load(self):
+        self.customer.location = 'Hostel B, Room 12'
+        self.customer.save()
+        near = User.objects.create_user(
+            username='near@example.com', email='near@example.com', password='testpass123',
+            full_name='Near Rider', phone='3344556677', role='delivery_person', location='hostel  B'
+        )
+        self.delivery_person.location = 'Library'
+        self.delivery_person.save()
+        orders = [self.order] + [Order.objects.create(customer=self.customer, total_price=20.00) for _ in range(4)]
+        unpaid = Order.objects.create(customer=self.customer, total_price=20.00)
+        for order in orders:
+            Payment.objects.create(order=order, amount=20.00, status='completed', mpesa_code=f'CODE{order.id}')
+        Payment.objects.create(order=unpaid, amount=20.00, status='pending')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deliveries = dispatch_deliveries(max_open=3, max_drops=1)
+
+        self.assertEqual(len(deliveries), 5)
+        riders = [delivery.delivery_person for delivery in sorted(deliveries, key=lambda d: d.order_id)]
+        # The same-zone rider fills up first, then the other rider takes the rest.
+        self.assertEqual(riders, [near, near, near, self.delivery_person, self.delivery_person])
+        self.assertFalse(Delivery.objects.filter(order=unpaid).exists())
+        self.assertEqual(
+            Notification.objects.filter(type='delivery_assigned', recipient=self.customer, channel='sms').count(), 5
+        )
+        self.assertEqual(dispatch_deliveries(), [])
+
+    def test_route_batches_orders_and_updates_them_together(self):
+        self.customer.location = 'Hostel B, Room 12'
+        self.customer.save()
+        orders = [self.order] + [Order.objects.create(customer=self.customer, total_price=20.00) for _ in range(3)]
+        for order in orders:
+            OrderItem.objects.create(order=order, product=self.product, quantity=1)
+            Payment.objects.create(order=order, amount=20.00, status='completed', mpesa_code=f'CODE{order.id}')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deliveries = dispatch_deliveries(max_open=3, max_drops=3)
+        # Three orders fill a route; the fourth waits for others to join it.
+        self.assertEqual(len(deliveries), 3)
+        route = DeliveryRoute.objects.get()
+        self.assertEqual(route.delivery_person, self.delivery_person)
+        self.assertEqual(set(route.deliveries.values_list('order_id', flat=True)), {order.id for order in orders[:3]})
+
+        self.client.force_authenticate(user=self.delivery_person)
+        # Going back to pending is not something customers are told about
+        response = self.client.put(f'/api/deliveries/routes/{route.id}/status/', {'status': 'pending'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Notification.objects.filter(type='delivery_status').exists())
+
+        cache.set(track_key(deliveries[0].id), [{'lat': -1.28, 'lng': 36.82, 'at': timezone.now().isoformat()}])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                f'/api/deliveries/routes/{route.id}/status/', {'status': 'picked_up', 'location': 'Cafeteria'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.data['deliveries']), sorted(delivery.id for delivery in deliveries))
+        self.assertEqual(Delivery.objects.filter(route=route, status='picked_up', location='Cafeteria').count(), 3)
+        # The rider's last streamed position is saved with the status, as for a single update
+        self.assertEqual(
+            Delivery.objects.filter(route=route, latitude__isnull=False).values_list('id', 'longitude').get(),
+            (deliveries[0].id, 36.82)
+        )
+        self.assertEqual(
+            Notification.objects.filter(type='delivery_status', recipient=self.customer, channel='in_app').count(), 3
+        )
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(
+            self.client.put(f'/api/deliveries/routes/{route.id}/status/', {'status': 'delivered'}).status_code, 403
+        )
+
+        # Reassigning a drop to another rider takes it off the route
+        other = User.objects.create_user(
+            username='other@example.com', email='other@example.com', password='testpass123',
+            full_name='Other Rider', phone='3344556677', role='delivery_person'
+        )
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post('/api/deliveries/assign/', {
+            'order_id': orders[0].id, 'delivery_person_id': other.id
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(Delivery.objects.get(order=orders[0]).route)
+        self.assertEqual(route.deliveries.count(), 2)
+
+    def test_track_is_decimated_and_compacted(self):
+        delivery = Delivery.objects.create(order=self.order, delivery_person=self.delivery_person)
+        start = timezone.now() - timedelta(days=10)
+        DeliveryLocation.objects.bulk_create(
+            DeliveryLocation(delivery=delivery, latitude=-1.28, longitude=36.8 + i / 1000, recorded_at=start + timedelta(seconds=5 * i))
+            for i in range(100)
+        )
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.get(f'/api/deliveries/{delivery.id}/track/?max_points=10')
+        self.assertEqual(response.status_code, 200)
+        points = response.data['points']
+        self.assertLessEqual(len(points), 11)
+        self.assertEqual(points[0]['lng'], 36.8)
+        self.assertEqual(points[-1]['lng'], 36.8 + 99 / 1000)  # the newest point is always kept
+        self.client.force_authenticate(user=self.vendor)
+        self.assertEqual(self.client.get(f'/api/deliveries/{delivery.id}/track/').status_code, 403)
+
+        # 100 pings 5s apart span 495s: at most one per minute bucket survives
+        deleted = compact_track(start, start + timedelta(hours=1), 60)
+        remaining = DeliveryLocation.objects.filter(delivery=delivery).count()
+        self.assertEqual(deleted + remaining, 100)
+        self.assertLessEqual(remaining, 10)
+        self.assertEqual(compact_track(start, start + timedelta(hours=1), 60), 0)
+
+    def test_compact_locations_looks_back_a_bounded_window(self):
+        delivery = Delivery.objects.create(order=self.order, delivery_person=self.delivery_person)
+
+        def pings(days_ago):
+            # Two minutes of pings 5s apart, starting half way through a minute
+            start = timezone.now().replace(second=30, microsecond=0) - timedelta(days=days_ago)
+            return DeliveryLocation.objects.bulk_create(
+                DeliveryLocation(delivery=delivery, latitude=-1.28, longitude=36.8, recorded_at=start + timedelta(seconds=5 * i))
+                for i in range(24)
+            )
+
+        recent, old = pings(8), pings(30)
+        # Chunks narrower than the pings still leave exactly one per minute bucket
+        call_command('compact_locations', '--chunk-hours', '0.01', stdout=StringIO())
+        self.assertEqual(DeliveryLocation.objects.filter(id__in=[p.id for p in recent]).count(), 3)
+        self.assertEqual(DeliveryLocation.objects.filter(id__in=[p.id for p in old]).count(), 24)
+        since = (timezone.now() - timedelta(days=31)).date().isoformat()
+        call_command('compact_locations', '--since', since, stdout=StringIO())
+        self.assertEqual(DeliveryLocation.objects.filter(id__in=[p.id for p in old]).count(), 3)
+
+
+class DispatchConcurrencyTests(TransactionTestCase):
+    # Real commits, so another connection can hold row locks.
+    def test_dispatch_skips_riders_locked_by_another_dispatcher(self):
+        customer = User.objects.create_user(
+            username='customer@example.com', email='customer@example.com', password='testpass123',
+            full_name='Customer User', phone='1122334455', role='customer'
+        )
+        busy, free = [
+            User.objects.create_user(
+                username=f'rider{i}@example.com', email=f'rider{i}@example.com', password='testpass123',
+                full_name=f'Rider {i}', phone=f'098765432{i}', role='delivery_person'
+            )
+            for i in range(2)
+        ]
+        order = Order.objects.create(customer=customer, total_price=20.00)
+        Payment.objects.create(order=order, amount=20.00, status='completed', mpesa_code='CODE1')
+        locked, release = threading.Event(), threading.Event()
+
+        def other_dispatcher():
+            try:
+                with transaction.atomic():
+                    User.objects.select_for_update().get(pk=busy.pk)
+                    locked.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_dispatcher)
+        thread.start()
+        try:
+            locked.wait(5)
+            deliveries = dispatch_deliveries(max_open=1, max_drops=1)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual([delivery.delivery_person for delivery in deliveries], [free])
+
+
+class RiderLocationTests(TransactionTestCase):
+    # The consumer reads through database_sync_to_async, which needs real commits.
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user(
+            username='customer@example.com', email='customer@example.com', password='testpass123',
+            full_name='Customer User', phone='1122334455', role='customer'
+        )
+        self.rider = User.objects.create_user(
+            username='delivery@example.com', email='delivery@example.com', password='testpass123',
+            full_name='Delivery Person', phone='0987654321', role='delivery_person'
+        )
+        order = Order.objects.create(customer=self.customer, total_price=20.00)
+        self.delivery = Delivery.objects.create(order=order, delivery_person=self.rider)
+
+    async def test_location_streamed_to_customer_without_per_ping_writes(self):
+        notifications = await sync_to_async(Notification.objects.count)()
+        stranger = WebsocketCommunicator(application, f"/ws/deliveries/{self.delivery.id}/location/")
+        stranger.scope['user'] = self.customer
+        connected, _ = await stranger.connect()
+        self.assertFalse(connected)
+
+        customer = WebsocketCommunicator(application, "/ws/notifications/")
+        customer.scope['user'] = self.customer
+        await customer.connect()
+        rider = WebsocketCommunicator(application, f"/ws/deliveries/{self.delivery.id}/location/")
+        rider.scope['user'] = self.rider
+        connected, _ = await rider.connect()
+        self.assertTrue(connected)
+
+        for lng in (36.80, 36.81, 36.82):
+            await rider.send_json_to({'lat': -1.28, 'lng': lng})
+            message = await customer.receive_json_from()
+            self.assertEqual(message['type'], 'rider_location')
+            self.assertEqual(message['lng'], lng)
+        await rider.send_json_to({'lat': 'north'})
+        self.assertEqual((await rider.receive_json_from())['type'], 'error')
+
+        delivery = await sync_to_async(Delivery.objects.get)(pk=self.delivery.pk)
+        self.assertIsNone(delivery.latitude)  # buffered, not yet saved
+        await rider.disconnect()
+        await customer.disconnect()
+        delivery = await sync_to_async(Delivery.objects.get)(pk=self.delivery.pk)
+        self.assertEqual((delivery.latitude, delivery.longitude), (-1.28, 36.82))
+        self.assertEqual(await sync_to_async(DeliveryLocation.objects.filter(delivery=delivery).count)(), 3)
+        self.assertEqual(await sync_to_async(Notification.objects.count)(), notifications)
@@ -0,0 +1,113 @@
+import math
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import Extract, Floor, RowNumber
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import Delivery, DeliveryLocation
+
+
+def track_key(delivery_id):
+    return f"delivery:track:{delivery_id}"
+
+
+def parse_ping(data):
+    """Validate a rider's ``{"lat": .., "lng": ..}`` message and return a ping dict, or raise ``ValueError``."""
+    try:
+        lat, lng = float(data['lat']), float(data['lng'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("lat and lng are required numbers")
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("lat or lng out of range")
+    return {'lat': lat, 'lng': lng, 'at': timezone.now().isoformat()}
+
+
+async def record_ping(delivery_id, ping):
+    """Append ``ping`` to the delivery's ring buffer of recent positions in the cache.
+
+    Only the rider's own socket writes to a delivery's buffer, so the
+    read-modify-write needs no lock. The buffer keeps the last
+    ``DELIVERY_TRACK_BUFFER_SIZE`` pings.
+    """
+    key = track_key(delivery_id)
+    pings = await cache.aget(key) or []
+    pings = (pings + [ping])[-settings.DELIVERY_TRACK_BUFFER_SIZE:]
+    await cache.aset(key, pings, settings.DELIVERY_TRACK_BUFFER_TIMEOUT)
+
+
+def recent_pings(delivery_id):
+    return cache.get(track_key(delivery_id)) or []
+
+
+def latest_position(delivery_id):
+    """The ``Delivery`` fields for the last buffered ping, or ``{}`` if there is none."""
+    pings = recent_pings(delivery_id)
+    if not pings:
+        return {}
+    ping = pings[-1]
+    return {'latitude': ping['lat'], 'longitude': ping['lng'], 'located_at': ping['at']}
+
+
+def save_pings(delivery_id, pings):
+    """Append ``pings`` to the location history and move the delivery to the last one.
+
+    The history rows go in with one ``bulk_create``; the delivery row gets a
+    plain UPDATE, so ``post_save`` is not sent, persisting positions never
+    triggers the status SMS, and ``updated_at`` keeps tracking real status
+    changes.
+    """
+    if not pings:
+        return
+    last = pings[-1]
+    with transaction.atomic():
+        DeliveryLocation.objects.bulk_create(
+            DeliveryLocation(delivery_id=delivery_id, latitude=ping['lat'], longitude=ping['lng'], recorded_at=ping['at'])
+            for ping in pings
+        )
+        Delivery.objects.filter(pk=delivery_id).update(latitude=last['lat'], longitude=last['lng'], located_at=last['at'])
+
+
+def track(delivery_id, max_points):
+    """Return a delivery's track as ``[{'lat', 'lng', 'at'}]``, oldest first, with at most ``max_points`` points.
+
+    Long tracks are decimated in the database - every Nth row by time, plus
+    the newest - so only the points drawn on the map are transferred. Pings
+    still waiting in the rider's buffer are appended so the track reaches
+    the rider's current position.
+    """
+    history = DeliveryLocation.objects.filter(delivery_id=delivery_id)
+    count = history.count()
+    step = max(1, math.ceil(count / max_points)) if max_points else 1
+    if step > 1:
+        history = history.annotate(row=Window(RowNumber(), order_by=[F('recorded_at'), F('id')]))
+        history = history.filter(row__in=[*range(1, count + 1, step), count])
+    points = [
+        {'lat': lat, 'lng': lng, 'at': recorded_at}
+        for lat, lng, recorded_at in history.order_by('recorded_at', 'id').values_list('latitude', 'longitude', 'recorded_at')
+    ]
+    newest = points[-1]['at'] if points else None
+    for ping in recent_pings(delivery_id):
+        at = parse_datetime(ping['at'])
+        if newest is None or at > newest:
+            points.append({'lat': ping['lat'], 'lng': ping['lng'], 'at': at})
+    return points
+
+
+def compact_track(start, end, interval):
+    """Thin location history recorded in ``[start, end)`` to one point per delivery per ``interval`` seconds.
+
+    The first ping of each bucket is kept. Compaction is idempotent, so
+    ranges that were already compacted only cost a scan of their remaining
+    rows. Returns the number of rows deleted.
+    """
+    bucket = Floor(Extract('recorded_at', 'epoch') / interval)
+    ranked = (
+        DeliveryLocation.objects.filter(recorded_at__gte=start, recorded_at__lt=end)
+        .annotate(rank=Window(RowNumber(), partition_by=[F('delivery_id'), bucket], order_by=[F('recorded_at'), F('id')]))
+        .filter(rank__gt=1)
+        .values('id')
+    )
+    deleted, _ = DeliveryLocation.objects.filter(id__in=ranked).delete()
+    return deleted
@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import DeliveryListView, DeliveryAssignView, DeliveryStatusView
+from .views import DeliveryListView, DeliveryAssignView, DeliveryStatusView, DeliveryTrackView, DeliveryRouteStatusView
 
 urlpatterns = [
     path('deliveries/', DeliveryListView.as_view(), name='delivery-list'),
     path('deliveries/assign/', DeliveryAssignView.as_view(), name='delivery-assign'),
     path('deliveries/<int:pk>/status/', DeliveryStatusView.as_view(), name='delivery-status'),
+    path('deliveries/<int:pk>/track/', DeliveryTrackView.as_view(), name='delivery-track'),
+    path('deliveries/routes/<int:pk>/status/', DeliveryRouteStatusView.as_view(), name='delivery-route-status'),
 ]
\ No newline at end of file
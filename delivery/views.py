@@ -1,21 +1,29 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Delivery
-from .serializers import DeliverySerializer, DeliveryAssignSerializer, DeliveryStatusSerializer
+from .models import Delivery, DeliveryRoute
+from .serializers import DeliverySerializer, DeliveryAssignSerializer, DeliveryStatusSerializer, DeliveryRouteSerializer
 from .permissions import IsAdminOrDeliveryPerson
+from .tracking import latest_position, track
+from campus_delivery.pagination import AssignedAtCursorPagination
+from notifications.services import NotificationBatch, add_delivery_status
 from orders.models import Order
 from users.models import User
 
 class DeliveryListView(generics.ListAPIView):
     serializer_class = DeliverySerializer
     permission_classes = [IsAdminOrDeliveryPerson]
+    pagination_class = AssignedAtCursorPagination
 
     def get_queryset(self):
+        queryset = Delivery.objects.with_order()
         if self.request.user.role == 'admin':
-            return Delivery.objects.all()
-        return Delivery.objects.filter(delivery_person=self.request.user)
+            return queryset
+        return queryset.filter(delivery_person=self.request.user)
 
 class DeliveryAssignView(APIView):
     permission_classes = [IsAuthenticated]
@@ -35,6 +43,9 @@ class DeliveryAssignView(APIView):
                     defaults={'delivery_person': delivery_person}
                 )
                 if not created:
+                    if delivery.delivery_person_id != delivery_person.id:
+                        # The route belongs to the previous rider
+                        delivery.route = None
                     delivery.delivery_person = delivery_person
                     delivery.save()
                 return Response(DeliverySerializer(delivery).data, status=status.HTTP_200_OK)
@@ -48,4 +59,58 @@ class DeliveryStatusView(generics.UpdateAPIView):
     permission_classes = [IsAdminOrDeliveryPerson]
     
     def perform_update(self, serializer):
-        serializer.save()
\ No newline at end of file
+        # Save the rider's last streamed position along with the new status.
+        serializer.save(**latest_position(serializer.instance.id))
+
+class DeliveryTrackView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        delivery = Delivery.objects.select_related('order').filter(pk=pk).first()
+        if delivery is None:
+            return Response({"detail": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+        if request.user.role != 'admin' and request.user.id not in (delivery.delivery_person_id, delivery.order.customer_id):
+            return Response({"detail": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            max_points = int(request.query_params.get('max_points', settings.DELIVERY_TRACK_MAX_POINTS))
+        except ValueError:
+            return Response({"max_points": ["A valid integer is required."]}, status=status.HTTP_400_BAD_REQUEST)
+        max_points = min(max(max_points, 2), settings.DELIVERY_TRACK_MAX_POINTS)
+        return Response({'delivery_id': delivery.id, 'points': track(delivery.id, max_points)})
+
+class DeliveryRouteStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request, pk):
+        """Move every open delivery on the route to the new status with one bulk UPDATE.
+
+        As for single status updates, each delivery also gets the rider's last
+        streamed position and customers are notified of the statuses in
+        ``Delivery.NOTIFY_STATUSES``, with their notifications written in one batch.
+        """
+        route = DeliveryRoute.objects.filter(pk=pk).first()
+        if route is None:
+            return Response({"detail": "Not found"}, status=status.HTTP_404_NOT_FOUND)
+        if request.user.role != 'admin' and request.user.id != route.delivery_person_id:
+            return Response({"detail": "Not authorized"}, status=status.HTTP_403_FORBIDDEN)
+        serializer = DeliveryStatusSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        changes = dict(serializer.validated_data, updated_at=timezone.now())
+        with transaction.atomic():
+            deliveries = list(
+                route.deliveries.select_for_update(of=('self',)).select_related('order__customer')
+                .filter(status__in=Delivery.OPEN_STATUSES)
+            )
+            for delivery in deliveries:
+                for field, value in dict(changes, **latest_position(delivery.id)).items():
+                    setattr(delivery, field, value)
+            Delivery.objects.bulk_update(deliveries, [*changes, 'latitude', 'longitude', 'located_at'])
+            route.status = changes['status']
+            route.save(update_fields=['status', 'updated_at'])
+            if route.status in Delivery.NOTIFY_STATUSES:
+                batch = NotificationBatch()
+                for delivery in deliveries:
+                    add_delivery_status(batch, delivery)
+                batch.save()
+        return Response(DeliveryRouteSerializer(route).data, status=status.HTTP_200_OK)
@@ -0,0 +1,10 @@
+import re
+
+
+def zone_of(location):
+    """Campus zone for a free-text location such as ``"Hostel B, Room 12"``.
+
+    The zone is the part before the first comma, case- and whitespace-
+    normalised (``"hostel b"``). Empty locations have no zone (``''``).
+    """
+    return re.sub(r'\s+', ' ', (location or '').split(',')[0]).strip().lower()
@@ -1,5 +1,11 @@
 import json
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from .models import Notification
+from .presence import mark_offline, mark_online
+from .services import notification_payload
 
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -7,12 +13,50 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             await self.close()
         else:
             self.group_name = f"user_{self.scope['user'].id}"
+            # Online before joining the group, so no push in between is skipped
+            await mark_online(self.scope['user'].id)
             await self.channel_layer.group_add(self.group_name, self.channel_name)
             await self.accept()
+            since_id = self.get_since_id()
+            if since_id is not None:
+                await self.replay(since_id)
 
     async def disconnect(self, close_code):
         if hasattr(self, 'group_name'):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            await mark_offline(self.scope['user'].id)
 
     async def send_notification(self, event):
-        await self.send(text_data=json.dumps(event['message']))
\ No newline at end of file
+        await self.send(text_data=json.dumps(event['message']))
+
+    def get_since_id(self):
+        # ws://<domain>/ws/notifications/?since_id=<last id the client saw>
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        try:
+            return int(query['since_id'][0])
+        except (KeyError, ValueError):
+            return None
+
+    async def replay(self, since_id):
+        """Send the in-app notifications created after ``since_id``, oldest first.
+
+        The socket joins its group before replaying, so a notification created
+        meanwhile may arrive twice; clients de-duplicate on ``id``. If more than
+        ``NOTIFICATION_REPLAY_LIMIT`` rows were missed, a ``replay_truncated``
+        message tells the client to fetch the rest from
+        ``/api/notifications/?since_id=``.
+        """
+        limit = settings.NOTIFICATION_REPLAY_LIMIT
+        missed = await self.get_missed(since_id, limit + 1)
+        for notification in missed[:limit]:
+            await self.send(text_data=json.dumps(notification_payload(notification)))
+        if len(missed) > limit:
+            await self.send(text_data=json.dumps({'type': 'replay_truncated', 'since_id': missed[limit - 1].id}))
+
+    @database_sync_to_async
+    def get_missed(self, since_id, limit):
+        return list(
+            Notification.objects.filter(recipient=self.scope['user'], channel='in_app', id__gt=since_id)
+            .only('id', 'type', 'message', 'created_at')
+            .order_by('id')[:limit]
+        )
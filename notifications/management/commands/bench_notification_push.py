@@ -0,0 +1,61 @@
+import statistics
+import time
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from notifications.presence import mark_offline, mark_online
+from notifications.services import NotificationBatch, push_in_app
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the cost of writing and pushing one in-app notification, with and "
+        "without presence checks. Runs inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=500)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--online', type=float, default=0.1, help="Fraction of users with an open socket.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            users = self.seed(options['users'])
+            online = users[:int(len(users) * options['online'])]
+            for user in online:
+                async_to_sync(mark_online)(user.id)
+            try:
+                self.stdout.write(f"{len(users)} users, {len(online)} online, {options['events']} events")
+                for enabled in (False, True):
+                    with override_settings(NOTIFICATION_PRESENCE_ENABLED=enabled):
+                        self.bench(users, options['events'], 'presence on ' if enabled else 'presence off')
+            finally:
+                for user in online:
+                    async_to_sync(mark_offline)(user.id)
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        return [
+            User.objects.create(
+                username=f'bench-user-{i}@example.com', email=f'bench-user-{i}@example.com',
+                full_name=f'Bench User {i}', phone=f'bench-{i:04}', role='customer',
+            )
+            for i in range(count)
+        ]
+
+    def bench(self, users, events, label):
+        timings = []
+        for i in range(events):
+            start = time.perf_counter()
+            batch = NotificationBatch()
+            batch.in_app(users[i % len(users)], 'order_placed', f"Benchmark notification {i}")
+            # The transaction is rolled back, so on_commit never fires; push directly.
+            push_in_app(batch.save())
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        self.stdout.write(
+            f"{label}: median={statistics.median(timings):6.3f}ms  p95={p95:6.3f}ms  total={sum(timings):8.1f}ms"
+        )
@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand
+from notifications.outbox import dispatch_pending
+from notifications.transports import get_sms_transport
+
+
+class Command(BaseCommand):
+    help = "Deliver queued SMS notifications from the outbox, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument('--once', action='store_true', help="Process a single batch and exit.")
+        parser.add_argument('--drain', action='store_true', help="Process batches until nothing is due, then exit.")
+        parser.add_argument(
+            '--transport', help="Dotted path of the SMS transport class (defaults to NOTIFICATION_SMS_TRANSPORT)."
+        )
+
+    def handle(self, *args, **options):
+        transport = get_sms_transport(options['transport'])
+        totals = [0, 0, 0]
+        start = time.monotonic()
+        while True:
+            counts = dispatch_pending(transport, options['batch_size'])
+            totals = [total + count for total, count in zip(totals, counts)]
+            if options['once'] or (options['drain'] and not any(counts)):
+                break
+            if not any(counts):
+                time.sleep(options['interval'])
+        elapsed = time.monotonic() - start
+        sent, failed, retrying = totals
+        self.stdout.write(
+            f"Sent {sent}, failed {failed}, retrying {retrying} in {elapsed:.2f}s "
+            f"({(sent + failed) / elapsed if elapsed else 0:.1f} msg/s)"
+        )
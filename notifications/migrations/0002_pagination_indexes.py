@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-17 03:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["created_at", "id"], name="notification_created_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-17 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0003_outboxmessage"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["recipient", "created_at", "id"],
+                name="notification_recipient_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-17 03:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0004_notification_recipient_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["recipient", "id"], name="notification_recipient_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-17 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0005_notification_recipient_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxmessage",
+            name="coalesce_key",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name="outboxmessage",
+            index=models.Index(
+                condition=models.Q(
+                    ("status", "pending"), models.Q(("coalesce_key", ""), _negated=True)
+                ),
+                fields=["coalesce_key"],
+                name="outbox_pending_coalesce_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-17 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0006_outboxmessage_coalesce_key"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="notification",
+            name="type",
+            field=models.CharField(
+                choices=[
+                    ("order_placed", "Order Placed"),
+                    ("payment_completed", "Payment Completed"),
+                    ("delivery_assigned", "Delivery Assigned"),
+                    ("delivery_status", "Delivery Status Update"),
+                    ("complaint_status", "Complaint Status Update"),
+                ],
+                max_length=50,
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-17 03:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0007_notification_complaint_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="subject",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name="notification",
+            name="channel",
+            field=models.CharField(
+                choices=[("sms", "SMS"), ("in_app", "In-App"), ("email", "Email")],
+                max_length=20,
+            ),
+        ),
+    ]
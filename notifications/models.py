@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from users.models import User
 
 class Notification(models.Model):
@@ -7,10 +8,12 @@ class Notification(models.Model):
         ('payment_completed', 'Payment Completed'),
         ('delivery_assigned', 'Delivery Assigned'),
         ('delivery_status', 'Delivery Status Update'),
+        ('complaint_status', 'Complaint Status Update'),
     )
     CHANNEL_CHOICES = (
         ('sms', 'SMS'),
         ('in_app', 'In-App'),
+        ('email', 'Email'),
     )
 
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
@@ -18,8 +21,48 @@ class Notification(models.Model):
     channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
     message = models.TextField()
     phone_number = models.CharField(max_length=15, blank=True)  # Used for SMS only
+    subject = models.CharField(max_length=255, blank=True)  # Used for email only
     status = models.CharField(max_length=20, default='sent')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='notification_created_id_idx'),
+            models.Index(fields=['recipient', 'created_at', 'id'], name='notification_recipient_idx'),
+            models.Index(fields=['recipient', 'id'], name='notification_recipient_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.type} notification ({self.channel}) to {self.recipient.full_name} at {self.created_at}"
+
+class OutboxMessage(models.Model):
+    # Outgoing SMS and email written in the same transaction as the event that caused it
+    # and delivered later by `manage.py dispatch_notifications`.
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    notification = models.OneToOneField(Notification, on_delete=models.CASCADE, related_name='outbox')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    # Pending messages sharing a key are merged into one (see NotificationBatch.sms)
+    coalesce_key = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'], condition=models.Q(status='pending'), name='outbox_pending_due_idx'
+            ),
+            models.Index(
+                fields=['coalesce_key'], condition=models.Q(status='pending') & ~models.Q(coalesce_key=''),
+                name='outbox_pending_coalesce_idx'
+            ),
+        ]
+
     def __str__(self):
-        return f"{self.type} notification ({self.channel}) to {self.recipient.full_name} at {self.created_at}"
\ No newline at end of file
+        return f"Outbox message {self.id} for notification {self.notification_id} ({self.status})"
@@ -0,0 +1,127 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+from .models import Notification, OutboxMessage
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2x base, 4x base, ... capped at the configured maximum."""
+    delay = settings.NOTIFICATION_OUTBOX_RETRY_BASE * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.NOTIFICATION_OUTBOX_RETRY_MAX))
+
+
+def recipient_status(results, phone_number):
+    """Look up a recipient's status in a provider response.
+
+    Providers echo numbers back in international format, so fall back to
+    matching on the last nine digits when the stored number is local
+    (``0712...``) rather than ``+254712...``.
+    """
+    if phone_number in results:
+        return results[phone_number]
+    suffix = phone_number[-9:]
+    for number, status in results.items():
+        if number[-9:] == suffix:
+            return status
+    return 'NoResult'
+
+
+def send_sms(transport, messages):
+    """Send SMS outbox messages, one provider request per distinct body.
+
+    Returns ``{message: (status, error)}``; ``status`` is ``None`` when the
+    request itself failed and may be retried.
+    """
+    groups = defaultdict(list)
+    for message in messages:
+        groups[message.notification.message].append(message)
+    outcomes = {}
+    for body, group in groups.items():
+        recipients = list(dict.fromkeys(message.notification.phone_number for message in group))
+        try:
+            results = transport.send(body, recipients)
+        except Exception as e:
+            outcomes.update((message, (None, str(e))) for message in group)
+            continue
+        outcomes.update(
+            (message, (recipient_status(results, message.notification.phone_number), ''))
+            for message in group
+        )
+    return outcomes
+
+
+def send_emails(messages):
+    """Send email outbox messages over a single SMTP connection; returns ``{message: (status, error)}``."""
+    outcomes = {}
+    if not messages:
+        return outcomes
+    with get_connection() as connection:
+        for message in messages:
+            notification = message.notification
+            try:
+                EmailMessage(
+                    notification.subject, notification.message, settings.DEFAULT_FROM_EMAIL,
+                    [notification.recipient.email], connection=connection
+                ).send()
+                outcomes[message] = ('Success', '')
+            except Exception as e:
+                outcomes[message] = (None, str(e))
+    return outcomes
+
+
+def dispatch_pending(transport, batch_size=100):
+    """Send one batch of due outbox messages and return ``(sent, failed, retrying)`` counts.
+
+    Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` in a short
+    transaction that leases them: ``attempts`` is counted and
+    ``next_attempt_at`` pushed ``NOTIFICATION_OUTBOX_LEASE`` seconds ahead, so
+    several dispatchers can drain the outbox concurrently without sending
+    twice, and a dispatcher that dies mid-send only delays its batch. The
+    claim also clears ``coalesce_key`` so later events don't edit a message
+    that is being sent. Sending happens outside any transaction and the
+    outcomes are written in a second one. SMS with the same body are sent as
+    one multi-recipient request and the provider's per-recipient results are
+    mapped back onto each row.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('notification__recipient')
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        for message in batch:
+            message.attempts += 1
+            message.next_attempt_at = now + timedelta(seconds=settings.NOTIFICATION_OUTBOX_LEASE)
+            message.coalesce_key = ''
+        OutboxMessage.objects.bulk_update(batch, ['attempts', 'next_attempt_at', 'coalesce_key'])
+
+    outcomes = send_sms(transport, [message for message in batch if message.notification.channel == 'sms'])
+    outcomes.update(send_emails([message for message in batch if message.notification.channel == 'email']))
+
+    now = timezone.now()
+    sent = failed = retrying = 0
+    for message in batch:
+        notification = message.notification
+        status, error = outcomes[message]
+        if status == 'Success':
+            message.status = notification.status = 'sent'
+            message.last_error = ''
+            sent += 1
+        elif status is None and message.attempts < settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS:
+            message.next_attempt_at = now + retry_delay(message.attempts)
+            message.last_error = error
+            retrying += 1
+        else:
+            # Rejected by the provider, or out of retries.
+            message.status = notification.status = 'failed'
+            message.last_error = error if status is None else status
+            failed += 1
+    with transaction.atomic():
+        OutboxMessage.objects.bulk_update(batch, ['status', 'next_attempt_at', 'last_error'])
+        Notification.objects.bulk_update([message.notification for message in batch], ['status'])
+    return sent, failed, retrying
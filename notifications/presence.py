@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+def presence_key(user_id):
+    return f"presence:user:{user_id}"
+
+
+async def mark_online(user_id):
+    """Count one more open socket for ``user_id``; a user may have several tabs open."""
+    key = presence_key(user_id)
+    if not await cache.aadd(key, 1, settings.NOTIFICATION_PRESENCE_TIMEOUT):
+        try:
+            await cache.aincr(key)
+            await cache.atouch(key, settings.NOTIFICATION_PRESENCE_TIMEOUT)
+        except ValueError:
+            # Expired between add() and incr().
+            await cache.aset(key, 1, settings.NOTIFICATION_PRESENCE_TIMEOUT)
+
+
+async def mark_offline(user_id):
+    key = presence_key(user_id)
+    try:
+        if await cache.adecr(key) <= 0:
+            await cache.adelete(key)
+    except ValueError:
+        pass
+
+
+def online_user_ids(user_ids):
+    """Return the subset of ``user_ids`` with an open socket, in one cache round trip.
+
+    With presence tracking disabled every user is treated as online.
+    """
+    user_ids = set(user_ids)
+    if not settings.NOTIFICATION_PRESENCE_ENABLED:
+        return user_ids
+    keys = {presence_key(user_id): user_id for user_id in user_ids}
+    return {keys[key] for key, count in cache.get_many(keys).items() if count > 0}
@@ -0,0 +1,33 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import Notification
+
+
+def retention_days(notification_type, channel):
+    """Days to keep notifications of ``notification_type`` sent over ``channel``.
+
+    ``NOTIFICATION_RETENTION_DAYS`` is keyed by ``'<type>:<channel>'`` with
+    ``*`` as a wildcard; the most specific key wins. ``None`` keeps rows forever.
+    """
+    policy = settings.NOTIFICATION_RETENTION_DAYS
+    for key in (f"{notification_type}:{channel}", f"{notification_type}:*", f"*:{channel}", "*:*"):
+        if key in policy:
+            return policy[key]
+    return None
+
+
+def expired_notifications(now=None):
+    """Yield ``(type, channel, queryset)`` for every type/channel with a retention period.
+
+    SMS still waiting in the outbox are never considered expired.
+    """
+    now = now or timezone.now()
+    for notification_type, _ in Notification.TYPE_CHOICES:
+        for channel, _ in Notification.CHANNEL_CHOICES:
+            days = retention_days(notification_type, channel)
+            if days is None:
+                continue
+            yield notification_type, channel, Notification.objects.filter(
+                type=notification_type, channel=channel, created_at__lt=now - timedelta(days=days)
+            ).exclude(status='queued')
@@ -0,0 +1,175 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import Notification, OutboxMessage
+from .presence import online_user_ids
+
+
+class NotificationBatch:
+    """Collects the notifications produced by one event and writes them together.
+
+    All rows go into the database with a single ``bulk_create`` and the SMS rows
+    are queued in the outbox with a second one. In-app pushes are built from the
+    rows just written, so no extra read is needed for their timestamps, and they
+    are only sent once the surrounding transaction commits.
+    """
+
+    def __init__(self):
+        self.notifications = []
+        self.outbox = []
+
+    def sms(self, recipient, notification_type, message, phone_number=None, coalesce_key='', delay=None):
+        """Queue an SMS, sent ``delay`` seconds from now (default ``NOTIFICATION_SMS_BATCH_WINDOW``).
+
+        If an SMS with the same ``coalesce_key`` is still waiting in the outbox,
+        its text is replaced with ``message`` and no new SMS is queued, so the
+        recipient only gets the latest state once the original delay expires.
+        """
+        notification = Notification(
+            recipient=recipient,
+            type=notification_type,
+            channel='sms',
+            message=message,
+            phone_number=phone_number or recipient.phone,
+            status='queued'
+        )
+        if delay is None:
+            delay = settings.NOTIFICATION_SMS_BATCH_WINDOW
+        self.notifications.append(notification)
+        self.outbox.append(OutboxMessage(
+            notification=notification,
+            coalesce_key=coalesce_key,
+            next_attempt_at=timezone.now() + timedelta(seconds=delay)
+        ))
+
+    def email(self, recipient, notification_type, subject, message):
+        """Queue an email to ``recipient``; it is sent by the outbox dispatcher."""
+        notification = Notification(
+            recipient=recipient,
+            type=notification_type,
+            channel='email',
+            subject=subject,
+            message=message,
+            status='queued'
+        )
+        self.notifications.append(notification)
+        self.outbox.append(OutboxMessage(notification=notification))
+
+    def in_app(self, recipient, notification_type, message):
+        self.notifications.append(Notification(
+            recipient=recipient,
+            type=notification_type,
+            channel='in_app',
+            message=message,
+            status='sent'
+        ))
+
+    def add(self, recipient, notification_type, message):
+        """Notify ``recipient`` by SMS and in-app with the same message."""
+        self.sms(recipient, notification_type, message)
+        self.in_app(recipient, notification_type, message)
+
+    def coalesce(self):
+        """Fold SMS into matching messages still pending in the outbox.
+
+        The pending row is locked, and a dispatcher claiming it clears its
+        ``coalesce_key``, so a message that is already being sent is not
+        matched and a new SMS is queued instead.
+        """
+        for outbox_message in [message for message in self.outbox if message.coalesce_key]:
+            pending = (
+                OutboxMessage.objects.select_for_update(of=('self',))
+                .filter(status='pending', coalesce_key=outbox_message.coalesce_key)
+                .first()
+            )
+            if pending:
+                Notification.objects.filter(pk=pending.notification_id).update(
+                    message=outbox_message.notification.message
+                )
+                self.outbox.remove(outbox_message)
+                self.notifications = [
+                    notification for notification in self.notifications
+                    if notification is not outbox_message.notification
+                ]
+
+    def save(self):
+        if not self.notifications:
+            return []
+        with transaction.atomic():
+            self.coalesce()
+            notifications = Notification.objects.bulk_create(self.notifications)
+            OutboxMessage.objects.bulk_create(self.outbox)
+            in_app = [notification for notification in notifications if notification.channel == 'in_app']
+            if in_app:
+                transaction.on_commit(lambda: push_in_app(in_app))
+        self.notifications = []
+        self.outbox = []
+        return notifications
+
+
+def add_delivery_assigned(batch, delivery):
+    """Add the SMS and in-app notifications for a newly assigned delivery to ``batch``."""
+    customer, rider, order_id = delivery.order.customer, delivery.delivery_person, delivery.order_id
+    batch.add(
+        customer, 'delivery_assigned',
+        f"Dear {customer.full_name}, your Order #{order_id} has been assigned for delivery."
+    )
+    if rider:
+        batch.add(
+            rider, 'delivery_assigned',
+            f"Dear {rider.full_name}, you have been assigned to deliver Order #{order_id}."
+        )
+
+
+def add_delivery_status(batch, delivery):
+    """Add the customer's notifications for a delivery status change to ``batch``.
+
+    In-app goes out immediately; the SMS is debounced per customer and order
+    so a burst of updates sends only the latest status.
+    """
+    customer = delivery.order.customer
+    message = f"Dear {customer.full_name}, your Order #{delivery.order_id} is now {delivery.status} at {delivery.location or 'unknown location'}."
+    batch.in_app(customer, 'delivery_status', message)
+    batch.sms(
+        customer, 'delivery_status', message,
+        coalesce_key=f"delivery_status:{customer.id}:{delivery.order_id}",
+        delay=settings.NOTIFICATION_DELIVERY_STATUS_SMS_WINDOW
+    )
+
+
+def notification_payload(notification):
+    """The JSON body pushed to websocket clients for an in-app notification."""
+    return {
+        'id': notification.id,
+        'type': notification.type,
+        'message': notification.message,
+        'created_at': str(notification.created_at)
+    }
+
+
+def push_in_app(notifications):
+    """Send in-app notifications to the websocket groups of their recipients."""
+    push_to_users([(notification.recipient_id, notification_payload(notification)) for notification in notifications])
+
+
+def push_to_users(messages):
+    """Send ``(user_id, payload)`` messages to the users' websocket groups if they are online.
+
+    Offline users get nothing pushed; anything they need is stored and is
+    fetched or replayed when they reconnect. When nobody is online the
+    channel layer and ``async_to_sync`` are skipped entirely.
+    """
+    online = online_user_ids(user_id for user_id, _ in messages)
+    messages = [(user_id, payload) for user_id, payload in messages if user_id in online]
+    if not messages:
+        return
+    channel_layer = get_channel_layer()
+
+    async def send_all():
+        for user_id, payload in messages:
+            await channel_layer.group_send(f"user_{user_id}", {'type': 'send_notification', 'message': payload})
+
+    async_to_sync(send_all)()
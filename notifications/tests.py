@@ -1,20 +1,31 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from rest_framework.test import APIClient
 from users.models import User
 from orders.models import Order
 from products.models import Product
 from payment.models import Payment
 from delivery.models import Delivery
-from .models import Notification
-from unittest.mock import patch
+from .models import Notification, OutboxMessage
+from .outbox import dispatch_pending
+from .services import NotificationBatch, push_in_app
+from .transports import FakeTransport
+import json
+import tempfile
+from io import StringIO
+from unittest.mock import AsyncMock, patch
+from django.core.management import call_command
+from django.test import override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from channels.testing import WebsocketCommunicator
-from channels.db import database_sync_to_async
+from asgiref.sync import sync_to_async
 from notifications.consumers import NotificationConsumer
 from campus_delivery.asgi import application
 
 class NotificationTests(TestCase):
-    async def asyncSetUp(self):
-        self.customer = await database_sync_to_async(User.objects.create_user)(
+    def setUp(self):
+        self.customer = User.objects.create_user(
             username='customer@example.com',
             email='customer@example.com',
             password='testpass123',
@@ -22,7 +33,7 @@ class NotificationTests(TestCase):
             phone='+254712345678',
             role='customer'
         )
-        self.delivery_person = await database_sync_to_async(User.objects.create_user)(
+        self.delivery_person = User.objects.create_user(
             username='delivery@example.com',
             email='delivery@example.com',
             password='testpass123',
@@ -30,7 +41,7 @@ class NotificationTests(TestCase):
             phone='+254798765432',
             role='delivery_person'
         )
-        self.admin = await database_sync_to_async(User.objects.create_user)(
+        self.admin = User.objects.create_user(
             username='admin@example.com',
             email='admin@example.com',
             password='testpass123',
@@ -38,7 +49,7 @@ class NotificationTests(TestCase):
             phone='+254723456789',
             role='admin'
         )
-        self.vendor = await database_sync_to_async(User.objects.create_user)(
+        self.vendor = User.objects.create_user(
             username='vendor@example.com',
             email='vendor@example.com',
             password='testpass123',
@@ -47,7 +58,7 @@ class NotificationTests(TestCase):
             role='vendor',
             is_approved=True
         )
-        self.product = await database_sync_to_async(Product.objects.create)(
+        self.product = Product.objects.create(
             vendor=self.vendor,
             name='Test Product',
             price=10.00,
@@ -55,45 +66,174 @@ class NotificationTests(TestCase):
             type='tangible',
             category='vegetable'
         )
-        self.order = await database_sync_to_async(Order.objects.create)(customer=self.customer, total_price=20.00)
+        self.order = Order.objects.create(customer=self.customer, total_price=20.00)
         self.client = APIClient()
-        await database_sync_to_async(self.client.force_authenticate)(user=self.customer)
+        self.client.force_authenticate(user=self.customer)
+        FakeTransport.outbox = []
 
-    def setUp(self):
-        import asyncio
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(self.asyncSetUp())
-
-    @patch('africastalking.SMS.send')
-    def test_order_placed_notification(self, mock_sms):
-        mock_sms.return_value = {'SMSMessageData': {'Message': 'Sent to 1/1'}}
+    def test_order_placed_notification(self):
         order = Order.objects.create(customer=self.customer, total_price=30.00)
-        notifications = Notification.objects.filter(type='order_placed', recipient=self.customer)
+        notifications = Notification.objects.filter(
+            type='order_placed', recipient=self.customer, message__contains=f"#{order.id} "
+        )
         self.assertEqual(notifications.count(), 2)  # SMS and in-app
         sms_notification = notifications.get(channel='sms')
         in_app_notification = notifications.get(channel='in_app')
-        self.assertEqual(sms_notification.status, 'sent')
+        # SMS is queued in the outbox and delivered by the dispatcher
+        self.assertEqual(sms_notification.status, 'queued')
         self.assertEqual(in_app_notification.status, 'sent')
-        mock_sms.assert_called_with(
-            f"Dear {self.customer.full_name}, your order #{order.id} has been placed successfully.",
-            [self.customer.phone]
+        self.assertEqual(FakeTransport.outbox, [])
+        call_command('dispatch_notifications', '--drain', stdout=StringIO())
+        sms_notification.refresh_from_db()
+        self.assertEqual(sms_notification.status, 'sent')
+        self.assertIn({
+            'message': f"Dear {self.customer.full_name}, your order #{order.id} has been placed successfully.",
+            'recipients': [self.customer.phone],
+        }, FakeTransport.outbox)
+
+    def test_outbox_retries_with_backoff(self):
+        # The SMS queued for the order created in setUp
+        message = OutboxMessage.objects.get(notification__recipient=self.customer, notification__type='order_placed')
+        with override_settings(NOTIFICATION_OUTBOX_MAX_ATTEMPTS=2):
+            sent, failed, retrying = dispatch_pending(FakeTransport(failure_rate=1))
+            self.assertEqual(retrying, 1)
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts), ('pending', 1))
+            self.assertGreater(message.next_attempt_at, timezone.now())
+            # Not due yet, so nothing is picked up
+            self.assertEqual(dispatch_pending(FakeTransport(failure_rate=1)), (0, 0, 0))
+
+            OutboxMessage.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now())
+            sent, failed, retrying = dispatch_pending(FakeTransport(failure_rate=1))
+            self.assertEqual(failed, 1)
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'failed')
+        self.assertEqual(message.notification.status, 'failed')
+
+    def test_outbox_sends_after_claiming(self):
+        OutboxMessage.objects.all().delete()
+        test = self
+
+        class UpdatingTransport:
+            def send(self, message, recipients):
+                # The claim is committed before sending: the row is leased, and
+                # an update arriving now queues a new SMS instead of editing it
+                claimed = OutboxMessage.objects.get()
+                test.assertEqual((claimed.status, claimed.attempts, claimed.coalesce_key), ('pending', 1, ''))
+                test.assertGreater(claimed.next_attempt_at, timezone.now())
+                batch = NotificationBatch()
+                batch.sms(test.customer, 'delivery_status', 'Delivered', coalesce_key='order:1')
+                batch.save()
+                return {recipient: 'Success' for recipient in recipients}
+
+        batch = NotificationBatch()
+        batch.sms(self.customer, 'delivery_status', 'On its way', coalesce_key='order:1')
+        batch.save()
+        self.assertEqual(dispatch_pending(UpdatingTransport()), (1, 0, 0))
+        self.assertQuerySetEqual(
+            OutboxMessage.objects.order_by('id').values_list('notification__message', 'status'),
+            [('On its way', 'sent'), ('Delivered', 'pending')]
+        )
+
+    def test_identical_sms_sent_in_one_request(self):
+        class RecordingTransport:
+            calls = []
+
+            def send(self, message, recipients):
+                self.calls.append(list(recipients))
+                # Provider answers in international format and rejects one number
+                return {'+254712345678': 'Success', '+254798765432': 'InvalidPhoneNumber'}
+
+        OutboxMessage.objects.all().delete()
+        self.delivery_person.phone = '0798765432'
+        batch = NotificationBatch()
+        batch.sms(self.customer, 'delivery_status', 'Lunch is on its way')
+        batch.sms(self.delivery_person, 'delivery_status', 'Lunch is on its way')
+        batch.save()
+
+        self.assertEqual(dispatch_pending(RecordingTransport()), (1, 1, 0))
+        self.assertEqual(RecordingTransport.calls, [['+254712345678', '0798765432']])
+        statuses = dict(
+            Notification.objects.filter(message='Lunch is on its way').values_list('recipient', 'status')
+        )
+        self.assertEqual(statuses, {self.customer.id: 'sent', self.delivery_person.id: 'failed'})
+
+    def test_delivery_status_sms_debounced(self):
+        delivery = Delivery.objects.create(order=self.order, delivery_person=self.delivery_person)
+        for status, location in [('picked_up', 'Cafeteria'), ('in_transit', 'Library'), ('in_transit', 'Hostel B')]:
+            delivery.status, delivery.location = status, location
+            delivery.save()
+        updates = Notification.objects.filter(type='delivery_status')
+        self.assertEqual(updates.filter(channel='in_app').count(), 3)  # pushed immediately
+        sms = updates.get(channel='sms')
+        self.assertIn('in_transit at Hostel B', sms.message)
+        self.assertGreater(sms.outbox.next_attempt_at, timezone.now())
+
+        # Once the pending SMS has gone out, the next update queues a new one
+        OutboxMessage.objects.filter(pk=sms.outbox.pk).update(status='sent')
+        delivery.status = 'delivered'
+        delivery.save()
+        self.assertEqual(updates.filter(channel='sms').count(), 2)
+
+    def test_delivery_notifications_written_in_one_insert(self):
+        with CaptureQueriesContext(connection) as ctx:
+            Delivery.objects.create(order=self.order, delivery_person=self.delivery_person)
+        inserts = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "notifications_notification"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertFalse(any('ORDER BY' in q['sql'] and 'notifications_notification' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(
+            Notification.objects.filter(type='delivery_assigned').count(), 4  # SMS and in-app for both parties
+        )
+
+    @override_settings(NOTIFICATION_PRESENCE_ENABLED=True)
+    def test_push_skipped_for_offline_users(self):
+        notifications = Notification.objects.filter(recipient=self.customer, channel='in_app')
+        with patch('notifications.services.get_channel_layer') as get_channel_layer:
+            get_channel_layer.return_value.group_send = AsyncMock()
+            push_in_app(list(notifications))
+            get_channel_layer.assert_not_called()
+            with override_settings(NOTIFICATION_PRESENCE_ENABLED=False):
+                push_in_app(list(notifications))
+            get_channel_layer.assert_called_once()
+
+    def test_prune_notifications(self):
+        old = timezone.now() - timezone.timedelta(days=100)
+        Notification.objects.filter(recipient=self.customer).update(created_at=old)  # setUp order: SMS queued + in-app
+        Notification.objects.create(recipient=self.customer, type='order_placed', channel='in_app', message='Recent')
+        out = StringIO()
+        call_command('prune_notifications', '--dry-run', stdout=out)
+        self.assertIn('Would delete 1 notifications', out.getvalue())
+
+        with tempfile.NamedTemporaryFile('r', suffix='.jsonl') as archive:
+            call_command('prune_notifications', '--chunk-size', '1', '--archive', archive.name, stdout=StringIO())
+            archived = [json.loads(line) for line in archive]
+        self.assertEqual([row['channel'] for row in archived], ['in_app'])
+        # The recent row and the SMS still waiting in the outbox are kept
+        self.assertQuerySetEqual(
+            Notification.objects.filter(recipient=self.customer).order_by('id').values_list('message', 'status'),
+            [(archived[0]['message'], 'queued'), ('Recent', 'sent')]
         )
 
-    @patch('africastalking.SMS.send')
-    async def test_websocket_notification(self, mock_sms):
-        mock_sms.return_value = {'SMSMessageData': {'Message': 'Sent to 1/1'}}
+    @override_settings(NOTIFICATION_PRESENCE_ENABLED=True)
+    async def test_websocket_notification(self):
         communicator = WebsocketCommunicator(application, "/ws/notifications/")
         communicator.scope['user'] = self.customer
         connected, _ = await communicator.connect()
         self.assertTrue(connected)
-        await database_sync_to_async(Order.objects.create)(customer=self.customer, total_price=30.00)
+
+        def place_order():
+            # In-app pushes go out on commit
+            with self.captureOnCommitCallbacks(execute=True):
+                Order.objects.create(customer=self.customer, total_price=30.00)
+
+        await sync_to_async(place_order)()
         message = await communicator.receive_json_from()
         self.assertEqual(message['type'], 'order_placed')
         self.assertIn(f"Dear {self.customer.full_name}, your order #", message['message'])
         await communicator.disconnect()
 
     def test_notification_list(self):
+        Notification.objects.all().delete()  # drop the ones generated by setUp
         Notification.objects.create(
             recipient=self.customer,
             type='order_placed',
@@ -104,4 +244,46 @@ class NotificationTests(TestCase):
         self.client.force_authenticate(user=self.customer)
         response = self.client.get('/api/notifications/')
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
\ No newline at end of file
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_notification_list_since_id(self):
+        seen = Notification.objects.filter(recipient=self.customer).latest('id')
+        Order.objects.create(customer=self.customer, total_price=30.00)
+        Order.objects.create(customer=self.customer, total_price=40.00)
+        response = self.client.get(f'/api/notifications/?since_id={seen.id}')
+        self.assertEqual(response.status_code, 200)
+        ids = [notification['id'] for notification in response.data['results']]
+        self.assertEqual(len(ids), 4)  # SMS and in-app for both orders
+        self.assertEqual(ids, sorted(ids))
+        self.assertGreater(ids[0], seen.id)
+        self.assertEqual(self.client.get('/api/notifications/?since_id=x').status_code, 400)
+
+
+class NotificationReplayTests(TransactionTestCase):
+    # The consumer reads through database_sync_to_async, which needs real commits.
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username='customer@example.com',
+            email='customer@example.com',
+            password='testpass123',
+            full_name='Customer User',
+            phone='+254712345678',
+            role='customer'
+        )
+        self.orders = [Order.objects.create(customer=self.customer, total_price=10.00) for _ in range(3)]
+
+    async def test_reconnect_replays_missed_notifications(self):
+        in_app = await sync_to_async(list)(
+            Notification.objects.filter(recipient=self.customer, channel='in_app').order_by('id')
+        )
+        communicator = WebsocketCommunicator(application, f"/ws/notifications/?since_id={in_app[0].id}")
+        communicator.scope['user'] = self.customer
+        with override_settings(NOTIFICATION_REPLAY_LIMIT=1):
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            first = await communicator.receive_json_from()
+            truncated = await communicator.receive_json_from()
+        self.assertEqual(first['id'], in_app[1].id)
+        self.assertEqual(truncated, {'type': 'replay_truncated', 'since_id': in_app[1].id})
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
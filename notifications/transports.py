@@ -0,0 +1,74 @@
+import random
+import time
+from django.conf import settings
+from django.utils.module_loading import import_string
+from campus_delivery.http_client import get_client
+
+
+class AfricasTalkingTransport:
+    """Sends SMS through the Africa's Talking SDK."""
+
+    def __init__(self):
+        import africastalking
+        africastalking.initialize(settings.AT_USERNAME, settings.AT_API_KEY)
+        self.sms = africastalking.SMS
+
+    def send(self, message, recipients):
+        """Send ``message`` to ``recipients`` and return ``{phone_number: status}``.
+
+        A status of ``'Success'`` means the provider accepted the message for that
+        recipient. Raises on transport errors so the caller can retry.
+        """
+        response = self.sms.send(message, recipients, settings.AT_SENDER_ID)
+        results = response.get('SMSMessageData', {}).get('Recipients', [])
+        return {result['number']: result['status'] for result in results}
+
+
+class HttpSmsTransport:
+    """Sends SMS with Africa's Talking's REST API through the shared outbound HTTP client.
+
+    Unlike the SDK this gets pooling, timeouts and latency metrics, and
+    ``AT_API_BASE_URL`` can point it at the local simulator.
+    """
+
+    def __init__(self):
+        self.client = get_client('africastalking')
+
+    def send(self, message, recipients):
+        data = {'username': settings.AT_USERNAME, 'to': ','.join(recipients), 'message': message}
+        if settings.AT_SENDER_ID:
+            data['from'] = settings.AT_SENDER_ID
+        response = self.client.post(
+            '/version1/messaging', endpoint='sms', data=data,
+            headers={'apiKey': settings.AT_API_KEY or '', 'Accept': 'application/json'}
+        )
+        response.raise_for_status()
+        results = response.json().get('SMSMessageData', {}).get('Recipients', [])
+        return {result['number']: result['status'] for result in results}
+
+
+class FakeTransport:
+    """In-memory transport for tests and offline load tests.
+
+    Sent messages are appended to ``FakeTransport.outbox``. Latency and failure
+    rate come from ``settings.NOTIFICATION_FAKE_TRANSPORT`` so a dispatcher can be
+    exercised against a slow or flaky provider without network access.
+    """
+    outbox = []
+
+    def __init__(self, latency=None, failure_rate=None):
+        options = getattr(settings, 'NOTIFICATION_FAKE_TRANSPORT', {})
+        self.latency = options.get('latency', 0) if latency is None else latency
+        self.failure_rate = options.get('failure_rate', 0) if failure_rate is None else failure_rate
+
+    def send(self, message, recipients):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectionError("Simulated SMS provider failure")
+        FakeTransport.outbox.append({'message': message, 'recipients': list(recipients)})
+        return {recipient: 'Success' for recipient in recipients}
+
+
+def get_sms_transport(path=None):
+    return import_string(path or settings.NOTIFICATION_SMS_TRANSPORT)()
@@ -1,5 +1,7 @@
 from rest_framework import generics
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from campus_delivery.pagination import IdCursorPagination
 from .models import Notification
 from .serializers import NotificationSerializer
 from .permissions import IsAdminOrRecipient
@@ -8,7 +10,29 @@ class NotificationListView(generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated, IsAdminOrRecipient]
 
+    def get_since_id(self):
+        since_id = self.request.query_params.get('since_id')
+        if since_id is None:
+            return None
+        try:
+            return int(since_id)
+        except ValueError:
+            raise ValidationError({'since_id': 'A valid integer is required.'})
+
+    @property
+    def paginator(self):
+        # ?since_id= returns only newer rows, oldest first, so a reconnecting
+        # client can page forward from where it left off.
+        if self.get_since_id() is not None:
+            self.pagination_class = IdCursorPagination
+        return super().paginator
+
     def get_queryset(self):
         if self.request.user.role == 'admin':
-            return Notification.objects.all()
-        return Notification.objects.filter(recipient=self.request.user)
\ No newline at end of file
+            queryset = Notification.objects.all()
+        else:
+            queryset = Notification.objects.filter(recipient=self.request.user)
+        since_id = self.get_since_id()
+        if since_id is not None:
+            queryset = queryset.filter(id__gt=since_id)
+        return queryset
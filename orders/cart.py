@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from campus_delivery.caches import is_shared
+from products.models import Product
+
+
+class CartStore:
+    """A customer's cart kept in the Django cache instead of the session.
+
+    Every cart line is its own counter key, so adding to a line is one atomic
+    ``incr`` and never touches the database. Lines are found through slot
+    keys: a new line takes the next slot number from an atomic counter and
+    writes its product id there, so concurrent adds of different products
+    never overwrite each other's entries the way a shared index would. Each
+    line also remembers its slot, so adding to it keeps the slot alive too.
+
+    Carts must live in a cache every worker shares; a per-process backend is
+    refused unless ``CART_CACHE_ALLOW_LOCAL``.
+    """
+
+    def __init__(self, user):
+        if not (settings.CART_CACHE_ALLOW_LOCAL or is_shared(settings.CART_CACHE_ALIAS)):
+            raise ImproperlyConfigured(
+                "CART_CACHE_ALIAS must be a cache shared by all workers (e.g. Redis), "
+                "or set CART_CACHE_ALLOW_LOCAL for a single process."
+            )
+        self.cache = caches[settings.CART_CACHE_ALIAS]
+        self.timeout = settings.CART_TIMEOUT
+        self.prefix = f"cart:{user.id}"
+        self.slots_key = f"{self.prefix}:slots"
+
+    def line_key(self, product_id):
+        return f"{self.prefix}:line:{product_id}"
+
+    def line_slot_key(self, product_id):
+        return f"{self.prefix}:line:{product_id}:slot"
+
+    def slot_key(self, slot):
+        return f"{self.prefix}:slot:{slot}"
+
+    def slot_keys(self):
+        return [self.slot_key(slot) for slot in range(1, (self.cache.get(self.slots_key) or 0) + 1)]
+
+    def product_ids(self):
+        return set(self.cache.get_many(self.slot_keys()).values())
+
+    def add(self, product_id, quantity=1):
+        key = self.line_key(product_id)
+        if not self.cache.add(key, quantity, self.timeout):
+            try:
+                quantity = self.cache.incr(key, quantity)
+                slot = self.cache.get(self.line_slot_key(product_id))
+                for touched in [key, self.line_slot_key(product_id), self.slots_key, self.slot_key(slot)]:
+                    self.cache.touch(touched, self.timeout)
+                return quantity
+            except ValueError:
+                # The line expired between add() and incr(); start it again.
+                self.cache.set(key, quantity, self.timeout)
+        self.cache.add(self.slots_key, 0, self.timeout)
+        try:
+            slot = self.cache.incr(self.slots_key)
+        except ValueError:
+            # The counter expired between add() and incr().
+            slot = 1
+            self.cache.set(self.slots_key, slot, self.timeout)
+        self.cache.touch(self.slots_key, self.timeout)
+        self.cache.set_many({self.slot_key(slot): product_id, self.line_slot_key(product_id): slot}, self.timeout)
+        return quantity
+
+    def items(self):
+        """Return ``{product_id: quantity}`` for every line in the cart."""
+        product_ids = self.product_ids()
+        quantities = self.cache.get_many([self.line_key(product_id) for product_id in product_ids])
+        return {
+            product_id: quantities[self.line_key(product_id)]
+            for product_id in product_ids
+            if self.line_key(product_id) in quantities
+        }
+
+    def lines(self):
+        """Return ``(product, quantity)`` pairs, loading all products with one query."""
+        items = self.items()
+        products = Product.objects.in_bulk(items.keys())
+        return [(products[product_id], quantity) for product_id, quantity in items.items() if product_id in products]
+
+    def clear(self):
+        slot_keys = self.slot_keys()
+        product_ids = set(self.cache.get_many(slot_keys).values())
+        self.cache.delete_many(
+            [self.line_key(product_id) for product_id in product_ids]
+            + [self.line_slot_key(product_id) for product_id in product_ids]
+            + slot_keys + [self.slots_key]
+        )
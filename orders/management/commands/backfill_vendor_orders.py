@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from orders.models import Order, OrderItem, VendorOrder
+
+
+class Command(BaseCommand):
+    help = "Populate the vendor-to-order index from existing order items."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Orders scanned per batch.")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        scanned = linked = 0
+        while True:
+            order_ids = list(
+                Order.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not order_ids:
+                break
+            pairs = (
+                OrderItem.objects.filter(order_id__in=order_ids)
+                .values_list('product__vendor_id', 'order_id')
+                .distinct()
+            )
+            # bulk_create(ignore_conflicts=True) returns every object it was given,
+            # inserted or not, so count the batch's rows instead
+            existing = VendorOrder.objects.filter(order_id__in=order_ids)
+            before = existing.count()
+            VendorOrder.link(pairs)
+            linked += existing.count() - before
+            scanned += len(order_ids)
+            last_id = order_ids[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {scanned} orders, added {linked} vendor/order pairs."
+        ))
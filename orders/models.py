@@ -2,6 +2,15 @@ from django.db import models
 from users.models import User
 from products.models import Product
 
+
+def order_items_prefetch(lookup='items'):
+    # Loads the items OrderSerializer nests, together with their product and vendor.
+    return models.Prefetch(lookup, queryset=OrderItem.objects.select_related('product__vendor'))
+
+class OrderQuerySet(models.QuerySet):
+    def with_items(self):
+        return self.select_related('customer').prefetch_related(order_items_prefetch())
+
 class Order(models.Model):
     STATUS_CHOICES = (
         ('in_progress', 'In Progress'),
@@ -13,6 +22,15 @@ class Order(models.Model):
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='order_created_id_idx'),
+            models.Index(fields=['customer', 'created_at', 'id'], name='order_customer_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.id} by {self.customer.full_name}"
@@ -22,5 +40,32 @@ class OrderItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        VendorOrder.link([(self.product.vendor_id, self.order_id)])
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.name} in Order {self.order.id}"
+
+class VendorOrder(models.Model):
+    # Denormalized (vendor, order) pairs so vendor screens don't have to join
+    # items -> product and de-duplicate. Kept in sync when items are written;
+    # rebuild with `manage.py backfill_vendor_orders`.
+    vendor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='vendor_orders')
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='vendor_links')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'order'], name='unique_vendor_order'),
+        ]
+
+    @classmethod
+    def link(cls, pairs):
+        """Insert ``(vendor_id, order_id)`` pairs, skipping ones that already exist."""
+        return cls.objects.bulk_create(
+            [cls(vendor_id=vendor_id, order_id=order_id) for vendor_id, order_id in set(pairs)],
+            ignore_conflicts=True
+        )
+
     def __str__(self):
-        return f"{self.quantity} x {self.product.name} in Order {self.order.id}"
\ No newline at end of file
+        return f"Order {self.order_id} for vendor {self.vendor_id}"
\ No newline at end of file
@@ -1,5 +1,5 @@
 from rest_framework import permissions
-from .models import Order
+from .models import Order, VendorOrder
 
 class IsCustomerOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -14,5 +14,5 @@ class IsVendorOrAdmin(permissions.BasePermission):
         if request.user.role == 'admin':
             return True
         if request.user.role == 'vendor' and request.user.is_approved:
-            return obj.items.filter(product__vendor=request.user).exists()
+            return VendorOrder.objects.filter(vendor=request.user, order=obj).exists()
         return False
\ No newline at end of file
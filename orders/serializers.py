@@ -1,14 +1,14 @@
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 from .models import Order, OrderItem
 from products.serializers import ProductSerializer
 from products.models import Product
+from .services import place_order
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
-    product_id = serializers.PrimaryKeyRelatedField(
-        queryset=Product.objects.all(), source='product', write_only=True
-    )
+    product_id = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = OrderItem
@@ -23,15 +23,18 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = ['id', 'customer', 'items', 'total_price', 'status', 'created_at']
         read_only_fields = ['id', 'customer', 'total_price', 'created_at']
 
+    def validate_items(self, items):
+        # Resolve every product with one query instead of one per line.
+        products = Product.objects.in_bulk({item['product_id'] for item in items})
+        missing = sorted({item['product_id'] for item in items} - products.keys())
+        if missing:
+            raise serializers.ValidationError(f"Invalid product id(s): {', '.join(map(str, missing))}")
+        return [{'product': products[item['product_id']], 'quantity': item['quantity']} for item in items]
+
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        order = Order.objects.create(customer=self.context['request'].user, **validated_data)
-        total_price = 0
-        for item_data in items_data:
-            item = OrderItem.objects.create(order=order, **item_data)
-            total_price += item.product.price * item.quantity
-        order.total_price = total_price
-        order.save()
+        order = place_order(self.context['request'].user, items_data, **validated_data)
+        prefetch_related_objects([order], 'items__product')
         return order
 
 class OrderStatusSerializer(serializers.ModelSerializer):
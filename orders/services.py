@@ -0,0 +1,20 @@
+from django.db import transaction
+from .models import Order, OrderItem, VendorOrder
+
+
+@transaction.atomic
+def place_order(customer, items, **order_fields):
+    """Create an order and its items in a single transaction.
+
+    ``items`` is a list of ``{'product': Product, 'quantity': int}`` dicts whose
+    products were already loaded by the caller, so no per-line product reads
+    happen here. The order row is inserted once with its final total and the
+    items are written with a single bulk INSERT.
+    """
+    total_price = sum(item['product'].price * item['quantity'] for item in items)
+    order = Order.objects.create(customer=customer, total_price=total_price, **order_fields)
+    OrderItem.objects.bulk_create(
+        [OrderItem(order=order, product=item['product'], quantity=item['quantity']) for item in items]
+    )
+    VendorOrder.link((item['product'].vendor_id, order.id) for item in items)
+    return order
@@ -1,11 +1,23 @@
-from django.test import TestCase
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
 from rest_framework.test import APIClient
 from users.models import User
 from products.models import Product
 from rest_framework import serializers
-from .models import Order, OrderItem
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from io import StringIO
+from campus_delivery.testing import QueryCountAssertionsMixin
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from .cart import CartStore
+from .models import Order, OrderItem, VendorOrder
 
-class OrderTests(TestCase):
+class OrderTests(QueryCountAssertionsMixin, TestCase):
     def setUp(self):
         self.client = APIClient()
         self.customer = User.objects.create_user(
@@ -34,25 +46,74 @@ class OrderTests(TestCase):
             category='vegetable'
         )
         self.client.force_authenticate(user=self.customer)
+        cache.clear()
 
     def test_add_to_cart(self):
         response = self.client.post('/api/cart/', {'product_id': self.product.id, 'quantity': 2})
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(self.client.session['cart'][str(self.product.id)], 2)
+        self.assertEqual(CartStore(self.customer).items(), {self.product.id: 2})
+
+    def test_cart_adds_increment_without_db_writes(self):
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(5):
+                self.client.post('/api/cart/', {'product_id': self.product.id, 'quantity': 1})
+        self.assertFalse([q for q in queries if not q['sql'].startswith('SELECT')])
+        self.assertEqual(CartStore(self.customer).items(), {self.product.id: 5})
+
+    def test_concurrent_adds_of_different_products_are_all_kept(self):
+        product_ids = list(range(1000, 1020))
+        get = LocMemCache.get
+
+        def slow_get(self, *args, **kwargs):
+            # Widen any read-modify-write window so the adds interleave
+            value = get(self, *args, **kwargs)
+            time.sleep(0.01)
+            return value
+
+        with patch.object(LocMemCache, 'get', slow_get), ThreadPoolExecutor(max_workers=len(product_ids)) as pool:
+            list(pool.map(lambda product_id: CartStore(self.customer).add(product_id, 1), product_ids))
+        self.assertEqual(CartStore(self.customer).items(), dict.fromkeys(product_ids, 1))
+        CartStore(self.customer).clear()
+        self.assertEqual(CartStore(self.customer).items(), {})
+
+    def test_cart_lines_keep_their_slot_alive(self):
+        cart = CartStore(self.customer)
+        cart.add(self.product.id, 1)
+        # Only a short TTL left on the slot; adding to the line extends it again
+        cache.touch(cart.slot_key(1), 0.1)
+        cart.add(self.product.id, 1)
+        time.sleep(0.2)
+        self.assertEqual(cart.items(), {self.product.id: 2})
+
+    @override_settings(CART_CACHE_ALLOW_LOCAL=False)
+    def test_cart_refuses_per_process_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            CartStore(self.customer)
+
+    def test_get_cart_hydrates_products_in_one_query(self):
+        cart = CartStore(self.customer)
+        for i in range(5):
+            product = Product.objects.create(
+                vendor=self.vendor, name=f'Cart Product {i}', price=1.00, quantity=10, type='tangible', category='other'
+            )
+            cart.add(product.id, i + 1)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/cart/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['cart']), 5)
 
     def test_create_order(self):
-        # First simulate adding item to cart
-        session = self.client.session
-        session['cart'] = {str(self.product.id): 2}
-        session.save()
-        
-        # Then create order (should use cart from session)
+        # First add an item to the cart
+        CartStore(self.customer).add(self.product.id, 2)
+
+        # Then create order (should use the cart)
         response = self.client.post('/api/orders/')
         
         self.assertEqual(response.status_code, 201)
         order = Order.objects.get(customer=self.customer)
         self.assertEqual(order.total_price, 20.00)
         self.assertEqual(order.items.count(), 1)
+        self.assertEqual(CartStore(self.customer).items(), {})
 
     def test_update_order_status(self):
         order = Order.objects.create(customer=self.customer, total_price=20.00)
@@ -68,3 +129,106 @@ class OrderTests(TestCase):
         self.client.force_authenticate(user=self.customer)
         response = self.client.put(f'/api/orders/{order.id}/status/', {'status': 'delivered'})
         self.assertEqual(response.status_code, 403)
+
+    def test_create_order_with_items(self):
+        other = Product.objects.create(
+            vendor=self.vendor, name='Other Product', price=2.50, quantity=10, type='tangible', category='fruit'
+        )
+        response = self.client.post('/api/orders/', {'items': [
+            {'product_id': self.product.id, 'quantity': 2},
+            {'product_id': other.id, 'quantity': 4},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(id=response.data['id'])
+        self.assertEqual(order.total_price, 30.00)
+        self.assertEqual(order.items.count(), 2)
+        self.assertEqual(len(response.data['items']), 2)
+
+    def test_create_order_invalid_product(self):
+        response = self.client.post('/api/orders/', {'items': [
+            {'product_id': self.product.id, 'quantity': 1},
+            {'product_id': 999999, 'quantity': 1},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_order_placement_query_count_is_flat(self):
+        products = [self.product] + [
+            Product.objects.create(
+                vendor=self.vendor, name=f'Product {i}', price=1.00, quantity=10, type='tangible', category='other'
+            )
+            for i in range(19)
+        ]
+        counts = {}
+        for lines in (1, 5, 20):
+            items = [{'product_id': product.id, 'quantity': 1} for product in products[:lines]]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post('/api/orders/', {'items': items}, format='json')
+            self.assertEqual(response.status_code, 201)
+            counts[lines] = len(queries)
+        self.assertEqual(counts[1], counts[5], counts)
+        self.assertEqual(counts[1], counts[20], counts)
+
+    def test_order_list_query_count(self):
+        def add_orders(count):
+            for _ in range(count):
+                order = Order.objects.create(customer=self.customer, total_price=20.00)
+                OrderItem.objects.create(order=order, product=self.product, quantity=2)
+        self.assertListQueriesConstant('/api/orders/', add_orders)
+
+    def test_vendor_order_list_uses_index(self):
+        other_vendor = User.objects.create_user(
+            username='other@example.com',
+            email='other@example.com',
+            password='testpass123',
+            full_name='Other Vendor',
+            phone='5555555555',
+            role='vendor',
+            is_approved=True
+        )
+        other_product = Product.objects.create(
+            vendor=other_vendor, name='Other Product', price=5.00, quantity=10, type='tangible', category='fruit'
+        )
+        response = self.client.post('/api/orders/', {'items': [
+            {'product_id': self.product.id, 'quantity': 1},
+            {'product_id': self.product.id, 'quantity': 2},
+        ]}, format='json')
+        mine = response.data['id']
+        self.client.post('/api/orders/', {'items': [{'product_id': other_product.id, 'quantity': 1}]}, format='json')
+        self.assertEqual(VendorOrder.objects.filter(vendor=self.vendor).count(), 1)
+
+        self.client.force_authenticate(user=self.vendor)
+        response = self.client.get('/api/orders/')
+        self.assertEqual([order['id'] for order in response.data['results']], [mine])
+
+    def test_backfill_vendor_orders(self):
+        order = Order.objects.create(customer=self.customer, total_price=20.00)
+        OrderItem.objects.bulk_create([OrderItem(order=order, product=self.product, quantity=2)])
+        self.assertFalse(VendorOrder.objects.exists())
+        out = StringIO()
+        call_command('backfill_vendor_orders', batch_size=1, stdout=out)
+        self.assertIn('added 1 vendor/order pairs', out.getvalue())
+        self.assertTrue(VendorOrder.objects.filter(vendor=self.vendor, order=order).exists())
+        # A second run finds every pair already there
+        out = StringIO()
+        call_command('backfill_vendor_orders', stdout=out)
+        self.assertIn('added 0 vendor/order pairs', out.getvalue())
+
+    def test_order_detail_conditional_get(self):
+        order = Order.objects.create(customer=self.customer, total_price=20.00)
+        OrderItem.objects.create(order=order, product=self.product, quantity=2)
+        response = self.client.get(f'/api/orders/{order.id}/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/orders/{order.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        order.status = 'delivered'
+        order.save()
+        response = self.client.get(f'/api/orders/{order.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get('/api/orders/999999/').status_code, 404)
@@ -5,32 +5,36 @@ from rest_framework.permissions import IsAuthenticated
 from .models import Order, OrderItem
 from .serializers import OrderSerializer, OrderStatusSerializer
 from .permissions import IsCustomerOrReadOnly, IsVendorOrAdmin
+from .cart import CartStore
 from products.models import Product
-from django.contrib.sessions.models import Session
+from products.serializers import ProductSerializer
+from campus_delivery.conditional import ConditionalRetrieveMixin
 
 class CartView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        cart = request.session.get('cart', {})
-        items = []
-        for product_id, quantity in cart.items():
-            product = Product.objects.get(id=product_id)
-            items.append({'product': product, 'quantity': quantity})
+        items = [
+            {'product': ProductSerializer(product).data, 'quantity': quantity}
+            for product, quantity in CartStore(request.user).lines()
+        ]
         return Response({'cart': items})
 
     def post(self, request):
-        product_id = request.data.get('product_id')
-        quantity = request.data.get('quantity', 1)
-        cart = request.session.get('cart', {})
-        cart[product_id] = cart.get(product_id, 0) + int(quantity)
-        request.session['cart'] = cart
-        request.session.modified = True
+        try:
+            product_id = int(request.data.get('product_id'))
+            quantity = int(request.data.get('quantity', 1))
+        except (TypeError, ValueError):
+            return Response({"detail": "product_id and quantity must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if quantity < 1:
+            return Response({"detail": "quantity must be at least 1"}, status=status.HTTP_400_BAD_REQUEST)
+        if not Product.objects.filter(id=product_id).exists():
+            return Response({"detail": "Product not found"}, status=status.HTTP_404_NOT_FOUND)
+        CartStore(request.user).add(product_id, quantity)
         return Response({'message': 'Item added to cart'})
 
     def delete(self, request):
-        request.session['cart'] = {}
-        request.session.modified = True
+        CartStore(request.user).clear()
         return Response({'message': 'Cart cleared'})
 
 class OrderListCreateView(generics.ListCreateAPIView):
@@ -38,23 +42,29 @@ class OrderListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsCustomerOrReadOnly]
 
     def get_queryset(self):
+        queryset = Order.objects.with_items()
         if self.request.user.role == 'admin':
-            return Order.objects.all()
+            return queryset
         if self.request.user.role == 'vendor' and self.request.user.is_approved:
-            return Order.objects.filter(items__product__vendor=self.request.user).distinct()
-        return Order.objects.filter(customer=self.request.user)
+            return queryset.filter(vendor_links__vendor=self.request.user)
+        return queryset.filter(customer=self.request.user)
 
-    # def perform_create(self, serializer):
-    #     cart = self.request.session.get('cart', {})
-    #     if not cart:
-    #         raise serializers.ValidationError("Cart is empty")
-    #     items_data = [{'product_id': int(pid), 'quantity': qty} for pid, qty in cart.items()]
-    #     serializer.save(items=items_data, customer=self.request.user)
-    #     self.request.session['cart'] = {}
-    #     self.request.session.modified = True
+    def create(self, request, *args, **kwargs):
+        # Without an explicit item list, the order is placed from the customer's cart.
+        if 'items' in request.data:
+            return super().create(request, *args, **kwargs)
+        cart = CartStore(request.user)
+        items = [{'product_id': product_id, 'quantity': quantity} for product_id, quantity in cart.items().items()]
+        if not items:
+            return Response({"detail": "Cart is empty"}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.get_serializer(data={'items': items})
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        cart.clear()
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=self.get_success_headers(serializer.data))
 
-class OrderDetailView(generics.RetrieveAPIView):
-    queryset = Order.objects.all()
+class OrderDetailView(ConditionalRetrieveMixin, generics.RetrieveAPIView):
+    queryset = Order.objects.with_items()
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
 
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from payment.services import process_stk_pushes
+
+
+class Command(BaseCommand):
+    help = "Send queued M-Pesa STK pushes for payments initiated in asynchronous mode."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10)
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Process a single batch and exit.")
+        parser.add_argument('--drain', action='store_true', help="Process batches until the queue is empty, then exit.")
+
+    def handle(self, *args, **options):
+        totals = [0, 0, 0]
+        while True:
+            counts = process_stk_pushes(options['batch_size'])
+            totals = [total + count for total, count in zip(totals, counts)]
+            if options['once'] or (options['drain'] and not any(counts)):
+                break
+            if not any(counts):
+                time.sleep(options['interval'])
+        sent, failed, unconfirmed = totals
+        self.stdout.write(
+            f"Sent {sent} STK pushes, {failed} failed, {unconfirmed} unconfirmed (left pending for reconcile_payments)"
+        )
@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from payment.models import Payment
+from payment.mpesa import get_access_token, stk_query, stk_query_outcome
+from payment.services import fail_unsent_payments, settle_payments
+
+
+class Command(BaseCommand):
+    help = (
+        "Settle payments whose M-Pesa callback never arrived by querying Daraja for the "
+        "STK push result, and fail queued payments whose push was never sent. Run it "
+        "periodically, e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=5, help="Minutes a payment must have been open.")
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--workers', type=int, default=8, help="Concurrent status queries.")
+
+    def handle(self, *args, **options):
+        access_token = get_access_token()
+        if not access_token:
+            raise CommandError("Failed to obtain M-Pesa token")
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+        # Served by the (status, timestamp) index
+        stale = Payment.objects.filter(status='pending', timestamp__lt=cutoff).order_by('timestamp', 'id')
+        counts = {'completed': 0, 'failed': 0, 'pending': 0}
+        start = time.monotonic()
+        while True:
+            unsent = fail_unsent_payments(cutoff, options['batch_size'])
+            if not unsent:
+                break
+            counts['failed'] += len(unsent)
+        last = None
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                page = stale
+                if last:
+                    page = stale.filter(Q(timestamp__gt=last[2]) | Q(timestamp=last[2], id__gt=last[0]))
+                batch = list(page.values_list('id', 'checkout_request_id', 'timestamp')[:options['batch_size']])
+                if not batch:
+                    break
+                last = batch[-1]
+                # No CheckoutRequestID to query: the push never got an answer and
+                # its callback has had the whole window to arrive
+                outcomes = {payment_id: 'failed' for payment_id, checkout_id, _ in batch if not checkout_id}
+                queried = [(payment_id, checkout_id) for payment_id, checkout_id, _ in batch if checkout_id]
+                for payment_id, outcome in pool.map(lambda item: self.query(access_token, *item), queried):
+                    if outcome:
+                        outcomes[payment_id] = outcome
+                for payment in settle_payments(outcomes):
+                    counts[payment.status] += 1
+                counts['pending'] += len(batch) - len(outcomes)
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Completed {counts['completed']}, failed {counts['failed']}, still pending {counts['pending']} "
+            f"in {elapsed:.2f}s"
+        ))
+
+    def query(self, access_token, payment_id, checkout_request_id):
+        try:
+            return payment_id, stk_query_outcome(stk_query(access_token, checkout_request_id))
+        except Exception:
+            return payment_id, None
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-17 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0002_payment_async_stk_push"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["status", "timestamp"], name="payment_status_timestamp_idx"
+            ),
+        ),
+    ]
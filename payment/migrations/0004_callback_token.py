@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-17 04:12
+
+import secrets
+
+from django.db import migrations, models
+import payment.models
+
+
+def give_each_payment_its_own_token(apps, schema_editor):
+    # AddField evaluates the default once, so existing rows share one token.
+    Payment = apps.get_model("payment", "Payment")
+    for payment in Payment.objects.only("id").iterator():
+        Payment.objects.filter(pk=payment.pk).update(callback_token=secrets.token_urlsafe(32))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0003_payment_status_timestamp_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="callback_token",
+            field=models.CharField(
+                default=payment.models.new_callback_token, editable=False, max_length=64
+            ),
+        ),
+        migrations.RunPython(give_each_payment_its_own_token, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,14 @@
+import secrets
 from django.db import models
 from orders.models import Order
 
+
+def new_callback_token():
+    return secrets.token_urlsafe(32)
+
 class Payment(models.Model):
     STATUS_CHOICES = (
+        ('initiating', 'Initiating'),  # STK push queued for `manage.py process_stk_pushes`
         ('pending', 'Pending'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
@@ -12,7 +18,16 @@ class Payment(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     mpesa_code = models.CharField(max_length=50, unique=True, blank=True, null=True)
+    phone_number = models.CharField(max_length=15, blank=True)
+    checkout_request_id = models.CharField(max_length=100, blank=True)
+    # Secret part of this payment's M-Pesa callback URL
+    callback_token = models.CharField(max_length=64, default=new_callback_token, editable=False)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'timestamp'], name='payment_status_timestamp_idx'),
+        ]
+
     def __str__(self):
         return f"Payment {self.id} for Order {self.order.id} ({self.status})"
\ No newline at end of file
@@ -0,0 +1,158 @@
+import base64
+import datetime
+import threading
+import time
+import requests
+from django.conf import settings
+from urllib3.exceptions import NewConnectionError
+from campus_delivery.http_client import get_client
+
+
+class MpesaUnavailable(Exception):
+    """Daraja could not be reached or did not issue an access token."""
+
+
+def request_not_sent(exc):
+    """Whether ``exc`` proves a request never reached Daraja.
+
+    Only then is it safe to fail the payment. After a read timeout or a
+    dropped connection the STK push may still have prompted the customer,
+    whose payment then arrives by callback or ``reconcile_payments``.
+    """
+    if isinstance(exc, (MpesaUnavailable, requests.ConnectTimeout)):
+        return True
+    if isinstance(exc, requests.ConnectionError) and exc.args:
+        # Connection refused or DNS failure, after any retries
+        return isinstance(getattr(exc.args[0], 'reason', None), NewConnectionError)
+    return False
+
+
+def fetch_access_token():
+    """Request a new Daraja OAuth token; returns ``(token, expires_in_seconds)``."""
+    credentials = f"{settings.MPESA_CONSUMER_KEY}:{settings.MPESA_CONSUMER_SECRET}"
+    headers = {'Authorization': 'Basic ' + base64.b64encode(credentials.encode()).decode()}
+    response = get_client('mpesa').get(
+        '/oauth/v1/generate', endpoint='oauth', params={'grant_type': 'client_credentials'}, headers=headers
+    )
+    data = response.json()
+    return data['access_token'], int(data.get('expires_in', 3599))
+
+
+class AccessTokenCache:
+    """Process-wide cache for the Daraja OAuth token.
+
+    The token is reused until shortly before Daraja says it expires
+    (``MPESA_TOKEN_REFRESH_MARGIN`` seconds early). Refreshes happen under a
+    lock, so concurrent requests in one worker wait for a single in-flight
+    fetch instead of each requesting their own token.
+    """
+
+    def __init__(self, fetch=fetch_access_token):
+        self.fetch = fetch
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.token = None
+        self.expires_at = 0
+
+    def valid_token(self):
+        if self.token and time.monotonic() < self.expires_at:
+            return self.token
+        return None
+
+    def get(self):
+        token = self.valid_token()
+        if token:
+            return token
+        with self.lock:
+            # Another thread may have refreshed while we waited for the lock.
+            token = self.valid_token()
+            if token:
+                return token
+            token, expires_in = self.fetch()
+            self.token = token
+            self.expires_at = time.monotonic() + max(expires_in - settings.MPESA_TOKEN_REFRESH_MARGIN, 0)
+            return token
+
+
+token_cache = AccessTokenCache()
+
+
+def get_access_token():
+    """Return a valid Daraja access token, or ``None`` if one can't be obtained."""
+    try:
+        return token_cache.get()
+    except Exception:
+        return None
+
+
+def stk_password():
+    """Return ``(password, timestamp)`` for signing an STK request."""
+    timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+    password = base64.b64encode(f"{settings.MPESA_SHORT_CODE}{settings.MPESA_PASSKEY}{timestamp}".encode()).decode()
+    return password, timestamp
+
+
+def stk_push(access_token, phone_number, amount, payment_id, callback_token):
+    """Ask Daraja to prompt ``phone_number`` for payment; returns the decoded response."""
+    business_short_code = settings.MPESA_SHORT_CODE
+    password, timestamp = stk_password()
+    payload = {
+        'BusinessShortCode': business_short_code,
+        'Password': password,
+        'Timestamp': timestamp,
+        'TransactionType': 'CustomerPayBillOnline',
+        'Amount': int(amount),
+        'PartyA': phone_number,
+        'PartyB': business_short_code,
+        'PhoneNumber': phone_number,
+        'CallBackURL': settings.MPESA_CALLBACK_URL + f'/api/payment/callback/{payment_id}/{callback_token}/',
+        'AccountReference': f'Order_{payment_id}',
+        'TransactionDesc': 'Payment for order'
+    }
+    response = get_client('mpesa').post(
+        '/mpesa/stkpush/v1/processrequest', endpoint='stk_push',
+        json=payload, headers={'Authorization': f'Bearer {access_token}'}
+    )
+    return response.json()
+
+
+def stk_query(access_token, checkout_request_id):
+    """Ask Daraja for the result of an STK push; returns the decoded response."""
+    password, timestamp = stk_password()
+    payload = {
+        'BusinessShortCode': settings.MPESA_SHORT_CODE,
+        'Password': password,
+        'Timestamp': timestamp,
+        'CheckoutRequestID': checkout_request_id,
+    }
+    response = get_client('mpesa').post(
+        '/mpesa/stkpushquery/v1/query', endpoint='stk_query',
+        json=payload, headers={'Authorization': f'Bearer {access_token}'}
+    )
+    return response.json()
+
+
+# STK result codes that mean the customer was never charged
+STK_FAILED_RESULT_CODES = {
+    '1',     # insufficient balance
+    '1019',  # transaction expired
+    '1025',  # error sending the push request
+    '1032',  # cancelled by the customer
+    '1037',  # phone unreachable / no response
+    '2001',  # wrong PIN
+}
+
+
+def stk_query_outcome(response):
+    """Map an STK query response to ``'completed'``, ``'failed'`` or ``None`` (unknown or still in progress)."""
+    result_code = response.get('ResultCode')
+    if result_code is None:
+        # e.g. errorCode 500.001.1001, "The transaction is being processed"
+        return None
+    result_code = str(result_code)
+    if result_code == '0':
+        return 'completed'
+    # Anything else (e.g. 4999, still processing) is left for the callback or the next run
+    return 'failed' if result_code in STK_FAILED_RESULT_CODES else None
@@ -0,0 +1,196 @@
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from notifications.services import NotificationBatch, push_to_users
+from orders.models import Order
+from .models import Payment
+from .mpesa import MpesaUnavailable, get_access_token, request_not_sent, stk_push
+
+# Payments that can still be settled by a callback or status query
+OPEN_STATUSES = ('initiating', 'pending')
+
+
+def payment_status_payload(payment):
+    return {
+        'type': 'payment_status',
+        'payment_id': payment.id,
+        'order_id': payment.order_id,
+        'status': payment.status,
+    }
+
+
+def notify_payment_status(payments):
+    """Push the new status of ``payments`` to their customers' websockets once the transaction commits."""
+    messages = [(payment.order.customer_id, payment_status_payload(payment)) for payment in payments]
+    if messages:
+        transaction.on_commit(lambda: push_to_users(messages))
+
+
+def send_stk_push(payment, phone_number):
+    """Send the STK push for ``payment`` and record the outcome on the instance (not saved).
+
+    Returns ``(ok, detail)``; ``detail`` is the provider's description on failure.
+    Raises ``MpesaUnavailable`` (or a ``requests`` error) if Daraja can't be reached.
+    """
+    access_token = get_access_token()
+    if not access_token:
+        raise MpesaUnavailable("Failed to obtain M-Pesa token")
+    response = stk_push(access_token, phone_number, payment.amount, payment.id, payment.callback_token)
+    if response.get('ResponseCode') == '0':
+        payment.status = 'pending'
+        payment.checkout_request_id = response.get('CheckoutRequestID', '')
+        return True, None
+    payment.status = 'failed'
+    return False, response.get('ResponseDescription', 'Payment initiation failed')
+
+
+def save_stk_push_outcome(payment):
+    """Write ``send_stk_push``'s outcome unless a callback already settled the payment.
+
+    The callback can land before the push request returns, so this is a
+    conditional UPDATE rather than a save. Returns ``True`` if it was written.
+    """
+    return bool(Payment.objects.filter(id=payment.id, status__in=OPEN_STATUSES).update(
+        status=payment.status, checkout_request_id=payment.checkout_request_id
+    ))
+
+
+def process_stk_pushes(batch_size=10):
+    """Send the STK pushes of queued (``initiating``) payments; returns ``(sent, failed, unconfirmed)`` counts.
+
+    Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` and moved to
+    ``pending`` in a short transaction, so several workers can run side by
+    side without prompting a customer twice and no lock is held during the
+    HTTP calls. Each outcome is then written with ``save_stk_push_outcome``.
+    A push that may have reached Daraja (e.g. a read timeout) is left
+    ``pending`` and counted as unconfirmed; ``reconcile_payments`` settles it.
+    """
+    with transaction.atomic():
+        batch = list(
+            Payment.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('order')
+            .filter(status='initiating')
+            .order_by('id')[:batch_size]
+        )
+        Payment.objects.filter(id__in=[payment.id for payment in batch]).update(status='pending')
+    sent = failed = unconfirmed = 0
+    changed = []
+    for payment in batch:
+        payment.status = 'pending'
+        try:
+            ok, _ = send_stk_push(payment, payment.phone_number)
+        except Exception as e:
+            if not request_not_sent(e):
+                unconfirmed += 1
+                continue
+            ok, payment.status = False, 'failed'
+        if save_stk_push_outcome(payment):
+            changed.append(payment)
+        sent += ok
+        failed += not ok
+    notify_payment_status(changed)
+    return sent, failed, unconfirmed
+
+
+@transaction.atomic
+def complete_payment(payment_id, mpesa_code):
+    """Mark a payment completed exactly once and queue its receipt and notifications.
+
+    The state change is a single conditional UPDATE, so of several concurrent
+    or repeated callbacks for the same payment only one changes the row; the
+    others, and any callback reusing an M-Pesa code that is already recorded,
+    return ``None`` without side effects. Returns the payment otherwise.
+    """
+    try:
+        with transaction.atomic():
+            updated = Payment.objects.filter(id=payment_id, status__in=OPEN_STATUSES).update(
+                status='completed', mpesa_code=mpesa_code
+            )
+    except IntegrityError:
+        # mpesa_code is unique: this receipt was already applied to a payment.
+        return None
+    if not updated:
+        return None
+    payment = Payment.objects.select_related('order__customer').get(id=payment_id)
+    Order.objects.filter(id=payment.order_id).update(status='in_progress', updated_at=timezone.now())
+    queue_payment_notifications([payment])
+    notify_payment_status([payment])
+    return payment
+
+
+@transaction.atomic
+def settle_payments(outcomes):
+    """Apply ``{payment_id: 'completed' | 'failed'}`` in bulk; returns the payments changed.
+
+    The still-open payments are locked first, so a callback racing with this
+    waits and then finds nothing left to do (and vice versa); notifications
+    are queued only for the rows changed here, in one batch.
+    """
+    payments = list(
+        Payment.objects.select_for_update(of=('self',))
+        .select_related('order__customer')
+        .filter(id__in=outcomes, status__in=OPEN_STATUSES)
+    )
+    for payment in payments:
+        payment.status = outcomes[payment.id]
+    Payment.objects.bulk_update(payments, ['status'])
+    completed = [payment for payment in payments if payment.status == 'completed']
+    Order.objects.filter(id__in=[payment.order_id for payment in completed]).update(
+        status='in_progress', updated_at=timezone.now()
+    )
+    queue_payment_notifications(completed)
+    notify_payment_status(payments)
+    return payments
+
+
+@transaction.atomic
+def fail_unsent_payments(cutoff, batch_size=100):
+    """Fail up to ``batch_size`` payments still ``initiating`` since before ``cutoff``; returns them.
+
+    Their STK push never went out (the worker died or never ran), so there is
+    no CheckoutRequestID to query. Rows a push worker holds are skipped; once
+    it commits they are ``pending`` and no longer match.
+    """
+    payments = list(
+        Payment.objects.select_for_update(skip_locked=True, of=('self',))
+        .select_related('order')
+        .filter(status='initiating', timestamp__lt=cutoff)
+        .order_by('timestamp', 'id')[:batch_size]
+    )
+    for payment in payments:
+        payment.status = 'failed'
+    Payment.objects.bulk_update(payments, ['status'])
+    notify_payment_status(payments)
+    return payments
+
+
+@transaction.atomic
+def fail_payment(payment_id):
+    """Mark an open payment failed; returns ``True`` if this call changed it."""
+    if not Payment.objects.filter(id=payment_id, status__in=OPEN_STATUSES).update(status='failed'):
+        return False
+    notify_payment_status([Payment.objects.select_related('order').get(id=payment_id)])
+    return True
+
+
+def queue_payment_notifications(payments):
+    """Queue the SMS, in-app notification and receipt email for completed payments."""
+    batch = NotificationBatch()
+    for payment in payments:
+        customer = payment.order.customer
+        # Payments settled by a status query have no receipt number
+        code = f" M-Pesa Code: {payment.mpesa_code}." if payment.mpesa_code else ""
+        batch.add(
+            customer, 'payment_completed',
+            f"Dear {customer.full_name}, payment of KES {payment.amount} for Order #{payment.order_id} received."
+            f"{code}"
+        )
+        code = f"M-Pesa Transaction Code: {payment.mpesa_code}\n" if payment.mpesa_code else ""
+        batch.email(
+            customer, 'payment_completed', f'Payment Receipt for Order {payment.order_id}',
+            f"Dear {customer.full_name},\n\n"
+            f"Thank you for your payment of KES {payment.amount} for Order {payment.order_id}.\n"
+            f"{code}"
+            f"Date: {payment.timestamp}\n\n"
+            f"Best regards,\nCampus Delivery Team"
+        )
+    batch.save()
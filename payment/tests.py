@@ -1,10 +1,23 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
+from django.db import connection
+from notifications.models import Notification, OutboxMessage
 from rest_framework.test import APIClient
 from users.models import User
 from orders.models import Order
 from products.models import Product
 from .models import Payment
-from unittest.mock import patch
+from .mpesa import AccessTokenCache, token_cache
+from simulator.server import ProviderSimulator
+from datetime import timedelta
+from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor
+import time
+import requests
+from io import StringIO
+from django.core.management import call_command
+from django.test import override_settings
+from unittest.mock import MagicMock, patch
+from urllib.parse import urlparse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.core import mail
@@ -39,18 +52,183 @@ class PaymentTests(TestCase):
         )
         self.order = Order.objects.create(customer=self.customer, total_price=20.00)
         self.client.force_authenticate(user=self.customer)
+        token_cache.clear()
 
-    @patch('payment.views.requests.get')
-    @patch('payment.views.requests.post')
-    def test_initiate_payment(self, mock_post, mock_get):
-        mock_get.return_value.json.return_value = {'access_token': 'test_token'}
-        mock_post.return_value.json.return_value = {'ResponseCode': '0'}
+    @patch('payment.mpesa.get_client')
+    def test_initiate_payment(self, get_client):
+        client = get_client.return_value
+        client.get.return_value.json.return_value = {'access_token': 'test_token', 'expires_in': '3599'}
+        client.post.return_value.json.return_value = {'ResponseCode': '0'}
+        for _ in range(2):
+            response = self.client.post('/api/payment/initiate/', {
+                'order_id': self.order.id,
+                'phone_number': '254758635561'
+            })
+            self.assertEqual(response.status_code, 200)
+        self.assertTrue(Payment.objects.filter(order=self.order, status='pending').exists())
+        # The OAuth token is fetched once and reused until it nears expiry
+        self.assertEqual(client.get.call_count, 1)
+        self.assertEqual(client.post.call_count, 2)
+        self.assertEqual(client.post.call_args.kwargs['endpoint'], 'stk_push')
+
+    @patch('payment.mpesa.get_client')
+    def test_initiate_payment_provider_timeout(self, get_client):
+        client = get_client.return_value
+        client.get.return_value.json.return_value = {'access_token': 'test_token', 'expires_in': '3599'}
+        # Never connected: the customer was not prompted, so the payment fails
+        client.post.side_effect = requests.ConnectTimeout
+        response = self.client.post('/api/payment/initiate/', {
+            'order_id': self.order.id,
+            'phone_number': '254758635561'
+        })
+        self.assertEqual(response.status_code, 503)
+        self.assertTrue(Payment.objects.filter(order=self.order, status='failed').exists())
+
+        # Timed out waiting for the answer: the prompt may have gone out, so the
+        # payment stays open for the callback or the sweeper
+        client.post.side_effect = requests.ReadTimeout
+        response = self.client.post('/api/payment/initiate/', {
+            'order_id': self.order.id,
+            'phone_number': '254758635561'
+        })
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Payment.objects.get(id=response.data['payment_id']).status, 'pending')
+
+    @patch('payment.mpesa.get_client')
+    def test_callback_before_stk_push_returns(self, get_client):
+        client = get_client.return_value
+        client.get.return_value.json.return_value = {'access_token': 'test_token', 'expires_in': '3599'}
+
+        def push_answered_instantly(path, endpoint, json, headers):
+            # Daraja calls back before the push request has returned
+            callback = APIClient().post(urlparse(json['CallBackURL']).path, stk_callback('RCPT_EARLY'), format='json')
+            self.assertEqual(callback.status_code, 200)
+            response = MagicMock()
+            response.json.return_value = {'ResponseCode': '0', 'CheckoutRequestID': 'ws_CO_9'}
+            return response
+
+        client.post.side_effect = push_answered_instantly
         response = self.client.post('/api/payment/initiate/', {
             'order_id': self.order.id,
             'phone_number': '254758635561'
         })
         self.assertEqual(response.status_code, 200)
-        self.assertTrue(Payment.objects.filter(order=self.order, status='pending').exists())
+        payment = Payment.objects.get(id=response.data['payment_id'])
+        self.assertEqual((payment.status, payment.mpesa_code), ('completed', 'RCPT_EARLY'))
+
+        # Nothing is left open for the sweeper to complete and notify again
+        later = timezone.now() + timedelta(hours=1)
+        with patch('payment.management.commands.reconcile_payments.timezone.now', return_value=later):
+            call_command('reconcile_payments', stdout=StringIO())
+        self.assertEqual(
+            Notification.objects.filter(type='payment_completed', recipient=self.customer).count(), 3
+        )
+
+    @patch('payment.mpesa.get_client')
+    def test_async_initiation_and_status(self, get_client):
+        client = get_client.return_value
+        client.get.return_value.json.return_value = {'access_token': 'test_token', 'expires_in': '3599'}
+        client.post.return_value.json.return_value = {'ResponseCode': '0', 'CheckoutRequestID': 'ws_CO_1'}
+        with override_settings(MPESA_ASYNC_STK_PUSH=True):
+            response = self.client.post('/api/payment/initiate/', {
+                'order_id': self.order.id,
+                'phone_number': '254758635561'
+            })
+        self.assertEqual(response.status_code, 202)
+        payment_id = response.data['payment_id']
+        client.post.assert_not_called()  # nothing sent to Daraja inside the request
+        status_url = f'/api/payment/{payment_id}/status/'
+        self.assertEqual(self.client.get(status_url).data['status'], 'initiating')
+
+        with patch('payment.services.push_to_users') as push, self.captureOnCommitCallbacks(execute=True):
+            call_command('process_stk_pushes', '--drain', stdout=StringIO())
+        push.assert_called_once_with([(self.customer.id, {
+            'type': 'payment_status', 'payment_id': payment_id, 'order_id': self.order.id, 'status': 'pending'
+        })])
+        with self.assertNumQueries(1):
+            response = self.client.get(status_url)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(Payment.objects.get(id=payment_id).checkout_request_id, 'ws_CO_1')
+
+        self.client.force_authenticate(user=self.vendor)
+        self.assertEqual(self.client.get(status_url).status_code, 404)
+
+    @patch('payment.mpesa.get_client')
+    def test_stk_push_worker_provider_errors(self, get_client):
+        client = get_client.return_value
+        client.get.return_value.json.return_value = {'access_token': 'test_token', 'expires_in': '3599'}
+        client.post.side_effect = [
+            requests.ReadTimeout, requests.ConnectTimeout, MagicMock(**{'json.return_value': {'ResponseCode': '0'}})
+        ]
+        timed_out, refused, accepted = (
+            Payment.objects.create(
+                order=self.order, amount=20.00, status='initiating', phone_number='254758635561'
+            ) for _ in range(3)
+        )
+        out = StringIO()
+        call_command('process_stk_pushes', '--once', stdout=out)
+        self.assertIn('Sent 1 STK pushes, 1 failed, 1 unconfirmed', out.getvalue())
+        statuses = dict(Payment.objects.values_list('id', 'status'))
+        # The timed-out push may have reached the customer: its callback or reconcile_payments settles it
+        self.assertEqual([statuses[p.id] for p in (timed_out, refused, accepted)], ['pending', 'failed', 'pending'])
+
+    def test_reconcile_stale_pending_payments(self):
+        def pending(checkout_request_id, minutes_ago=30):
+            payment = Payment.objects.create(
+                order=self.order, amount=20.00, status='pending', checkout_request_id=checkout_request_id
+            )
+            Payment.objects.filter(id=payment.id).update(timestamp=timezone.now() - timedelta(minutes=minutes_ago))
+            return payment
+
+        paid, cancelled, processing, never_pushed = pending('ws_1'), pending('ws_2'), pending('ws_3'), pending('')
+        recent, unknown = pending('ws_4', minutes_ago=1), pending('ws_5')
+        stuck, queued = pending(''), pending('', minutes_ago=1)
+        Payment.objects.filter(id__in=[stuck.id, queued.id]).update(status='initiating')
+        with ProviderSimulator(callbacks=False) as simulator, \
+                override_settings(OUTBOUND_HTTP={'mpesa': {'base_url': simulator.url}}):
+            simulator.query_results.update({'ws_1': 0, 'ws_2': 1032, 'ws_4': 0, 'ws_5': 4999})
+            out = StringIO()
+            call_command('reconcile_payments', '--workers', '2', '--batch-size', '2', stdout=out)
+        self.assertIn('Completed 1, failed 3, still pending 2', out.getvalue())
+        statuses = dict(Payment.objects.values_list('id', 'status'))
+        self.assertEqual(
+            [statuses[p.id] for p in (paid, cancelled, processing, never_pushed, recent, unknown, stuck, queued)],
+            ['completed', 'failed', 'pending', 'failed', 'pending', 'pending', 'failed', 'initiating']
+        )
+        queries = [path for method, path in simulator.requests if path == '/mpesa/stkpushquery/v1/query']
+        self.assertEqual(len(queries), 4)  # the recent payment and the one never pushed aren't queried
+        self.assertEqual(
+            Notification.objects.filter(type='payment_completed', recipient=self.customer).count(), 3
+        )
+        # A status query carries no receipt number, so none is quoted
+        for notification in Notification.objects.filter(type='payment_completed', recipient=self.customer):
+            self.assertNotIn('M-Pesa', notification.message)
+
+    def test_declined_payment_callback_is_acknowledged(self):
+        payment = Payment.objects.create(order=self.order, amount=20.00, status='pending')
+        response = APIClient().post(
+            f'/api/payment/callback/{payment.id}/{payment.callback_token}/',
+            {"Body": {"stkCallback": {"ResultCode": 1032, "ResultDesc": "Request cancelled by user"}}},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # so Daraja doesn't retry
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'failed')
+
+    def test_token_refresh_is_single_flight(self):
+        calls = []
+
+        def slow_fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return f'token-{len(calls)}', 3599
+
+        cache = AccessTokenCache(fetch=slow_fetch)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            tokens = list(pool.map(lambda _: cache.get(), range(8)))
+        self.assertEqual(tokens, ['token-1'] * 8)
+        cache.clear()
+        self.assertEqual(cache.get(), 'token-2')
 
     @patch('django.core.mail.send_mail')
     def test_payment_callback(self, mock_send_mail):
@@ -72,18 +250,86 @@ class PaymentTests(TestCase):
             }
         }
         mail.outbox = []
-        response = self.client.post(
-            f'/api/payment/callback/{payment.id}/',
-            callback_data,
-            format='json'  
-        )
+        # Without the payment's callback token the result is not accepted
+        client = APIClient()
+        for token in ('', 'guessed'):
+            response = client.post(f'/api/payment/callback/{payment.id}/{token}/', callback_data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'pending')
+
+        callback_url = f'/api/payment/callback/{payment.id}/{payment.callback_token}/'
+        response = client.post(callback_url, callback_data, format='json')
         # Assertions
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         payment.refresh_from_db()
         self.assertEqual(payment.status, 'completed')
 
-        # Check email was sent via locmem backend
+        # The receipt is queued in the notification outbox and sent by the dispatcher
+        self.assertEqual(len(mail.outbox), 0)
+        call_command('dispatch_notifications', '--drain', stdout=StringIO())
         self.assertEqual(len(mail.outbox), 1)
         email = mail.outbox[0]
-        self.assertEqual(email.subject, 'Payment Receipt for Order 2')
-        self.assertEqual(email.to, [self.customer.email])
\ No newline at end of file
+        self.assertEqual(email.subject, f'Payment Receipt for Order {self.order.id}')
+        self.assertEqual(email.to, [self.customer.email])
+
+        # A retried callback is acknowledged without doing anything again
+        response = client.post(callback_url, callback_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            Notification.objects.filter(type='payment_completed', recipient=self.customer).count(), 3
+        )  # SMS, in-app and email, once
+
+
+def stk_callback(mpesa_code):
+    return {
+        "Body": {
+            "stkCallback": {
+                "ResultCode": 0,
+                "CallbackMetadata": {
+                    "Item": [
+                        {"Name": "Amount", "Value": 20},
+                        {"Name": "MpesaReceiptNumber", "Value": mpesa_code}
+                    ]
+                }
+            }
+        }
+    }
+
+
+class PaymentCallbackConcurrencyTests(TransactionTestCase):
+    # Real commits, so parallel requests each run in their own transaction.
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username='customer@example.com',
+            email='customer@example.com',
+            password='testpass123',
+            full_name='Customer User',
+            phone='254758635561',
+            role='customer'
+        )
+        self.order = Order.objects.create(customer=self.customer, total_price=20.00)
+        self.payment = Payment.objects.create(order=self.order, amount=20.00, status='pending')
+
+    def post_callback(self, mpesa_code):
+        try:
+            return APIClient().post(
+                f'/api/payment/callback/{self.payment.id}/{self.payment.callback_token}/',
+                stk_callback(mpesa_code), format='json'
+            ).status_code
+        finally:
+            connection.close()
+
+    def test_duplicate_callbacks_in_parallel(self):
+        codes = ['RCPT001'] * 8 + ['RCPT002'] * 2  # Daraja retries, plus a conflicting receipt
+        with ThreadPoolExecutor(max_workers=len(codes)) as pool:
+            statuses = list(pool.map(self.post_callback, codes))
+        self.assertEqual(statuses, [200] * len(codes))
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'completed')
+        self.assertIn(self.payment.mpesa_code, ('RCPT001', 'RCPT002'))
+        notifications = Notification.objects.filter(type='payment_completed')
+        self.assertEqual(
+            sorted(notifications.values_list('channel', flat=True)), ['email', 'in_app', 'sms']
+        )
+        self.assertEqual(OutboxMessage.objects.filter(notification__in=notifications).count(), 2)
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import PaymentInitiateView, PaymentCallbackView
+from .views import PaymentInitiateView, PaymentCallbackView, PaymentStatusView
 
 urlpatterns = [
     path('payment/initiate/', PaymentInitiateView.as_view(), name='payment-initiate'),
-    path('payment/callback/<int:payment_id>/', PaymentCallbackView.as_view(), name='payment-callback'),
+    path('payment/callback/<int:payment_id>/<str:token>/', PaymentCallbackView.as_view(), name='payment-callback'),
+    path('payment/<int:payment_id>/status/', PaymentStatusView.as_view(), name='payment-status'),
 ]
\ No newline at end of file
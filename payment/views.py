@@ -1,15 +1,15 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from .models import Payment
 from .serializers import PaymentSerializer, PaymentInitiateSerializer
 from orders.models import Order
-from django.core.mail import send_mail
+from .mpesa import MpesaUnavailable, request_not_sent
+from .services import complete_payment, fail_payment, save_stk_push_outcome, send_stk_push
 from django.conf import settings
 import requests
-import base64
-import datetime
+import secrets
 
 class PaymentInitiateView(APIView):
     permission_classes = [IsAuthenticated]
@@ -23,99 +23,87 @@ class PaymentInitiateView(APIView):
                 order = Order.objects.get(id=order_id, customer=request.user)
                 if order.payments.filter(status='completed').exists():
                     return Response({"detail": "Order already paid"}, status=status.HTTP_400_BAD_REQUEST)
-                
+
+                if settings.MPESA_ASYNC_STK_PUSH:
+                    # Queue the push for `manage.py process_stk_pushes` and answer
+                    # immediately; the client polls the status endpoint or waits
+                    # for a payment_status websocket message.
+                    payment = Payment.objects.create(
+                        order=order,
+                        amount=order.total_price,
+                        phone_number=phone_number,
+                        status='initiating'
+                    )
+                    return Response(
+                        {"payment_id": payment.id, "status": payment.status},
+                        status=status.HTTP_202_ACCEPTED
+                    )
+
                 # M-Pesa STK Push
-                access_token = self.get_mpesa_access_token()
-                if not access_token:
-                    return Response({"detail": "Failed to obtain M-Pesa token"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                
                 payment = Payment.objects.create(
                     order=order,
                     amount=order.total_price,
+                    phone_number=phone_number,
                     status='pending'
                 )
-                
-                response = self.initiate_stk_push(access_token, phone_number, order.total_price, payment.id)
-                if response.get('ResponseCode') == '0':
-                    return Response({"message": "Payment initiated, awaiting user confirmation"}, status=status.HTTP_200_OK)
-                else:
-                    payment.status = 'failed'
-                    payment.save()
-                    return Response({"detail": response.get('ResponseDescription', 'Payment initiation failed')}, status=status.HTTP_400_BAD_REQUEST)
+                try:
+                    ok, detail = send_stk_push(payment, phone_number)
+                except (MpesaUnavailable, requests.RequestException, ValueError) as e:
+                    if request_not_sent(e):
+                        fail_payment(payment.id)
+                        return Response({"detail": "M-Pesa is unavailable, please try again"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+                    # The prompt may have reached the customer: leave the payment
+                    # pending for the callback or `manage.py reconcile_payments`.
+                    return Response(
+                        {"payment_id": payment.id, "status": 'pending'}, status=status.HTTP_202_ACCEPTED
+                    )
+                save_stk_push_outcome(payment)
+                if ok:
+                    return Response({"message": "Payment initiated, awaiting user confirmation", "payment_id": payment.id}, status=status.HTTP_200_OK)
+                return Response({"detail": detail}, status=status.HTTP_400_BAD_REQUEST)
             except Order.DoesNotExist:
                 return Response({"detail": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    def get_mpesa_access_token(self):
-        consumer_key = settings.MPESA_CONSUMER_KEY
-        consumer_secret = settings.MPESA_CONSUMER_SECRET
-        api_url = 'https://sandbox.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials'
-        headers = {
-            'Authorization': 'Basic ' + base64.b64encode(f"{consumer_key}:{consumer_secret}".encode()).decode()
-        }
-        try:
-            response = requests.get(api_url, headers=headers)
-            return response.json().get('access_token')
-        except:
-            return None
+class PaymentStatusView(APIView):
+    permission_classes = [IsAuthenticated]
 
-    def initiate_stk_push(self, access_token, phone_number, amount, payment_id):
-        api_url = 'https://sandbox.safaricom.co.ke/mpesa/stkpush/v1/processrequest'
-        headers = {'Authorization': f'Bearer {access_token}'}
-        timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
-        business_short_code = settings.MPESA_SHORT_CODE
-        passkey = settings.MPESA_PASSKEY
-        password = base64.b64encode(f"{business_short_code}{passkey}{timestamp}".encode()).decode()
-        payload = {
-            'BusinessShortCode': business_short_code,
-            'Password': password,
-            'Timestamp': timestamp,
-            'TransactionType': 'CustomerPayBillOnline',
-            'Amount': int(amount),
-            'PartyA': phone_number,
-            'PartyB': business_short_code,
-            'PhoneNumber': phone_number,
-            'CallBackURL': settings.MPESA_CALLBACK_URL + f'/api/payment/callback/{payment_id}/',
-            'AccountReference': f'Order_{payment_id}',
-            'TransactionDesc': 'Payment for order'
-        }
-        response = requests.post(api_url, json=payload, headers=headers)
-        return response.json()
+    def get(self, request, payment_id):
+        # A single indexed lookup returning only what a polling client needs
+        payments = Payment.objects.filter(id=payment_id)
+        if request.user.role != 'admin':
+            payments = payments.filter(order__customer=request.user)
+        payment = payments.values('id', 'order_id', 'status', 'mpesa_code').first()
+        if payment is None:
+            return Response({"detail": "Payment not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(payment)
 
 class PaymentCallbackView(APIView):
-    def post(self, request, payment_id):
-        try:
-            payment = Payment.objects.get(id=payment_id)
-            data = request.data.get('Body', {}).get('stkCallback', {})
-            result_code = data.get('ResultCode')
-            if result_code == 0:
-                payment.status = 'completed'
-                payment.mpesa_code = data.get('CallbackMetadata', {}).get('Item', [{}])[1].get('Value')
-                payment.save()
-                payment.order.status = 'in_progress'  # Update order status
-                payment.order.save()
-                self.send_receipt(payment)
-                return Response({"message": "Payment processed successfully"}, status=status.HTTP_200_OK)
-            else:
-                payment.status = 'failed'
-                payment.save()
-                return Response({"message": "Payment failed"}, status=status.HTTP_400_BAD_REQUEST)
-        except Payment.DoesNotExist:
-            return Response({"detail": "Payment not found"}, status=status.HTTP_404_NOT_FOUND)
+    """Receives Daraja's STK push result.
+
+    Daraja retries callbacks it doesn't see acknowledged, so this must be
+    safe to run any number of times, concurrently: the payment changes state
+    once, and the receipt and notifications are queued only by that change.
+    The URL carries the payment's secret ``callback_token``, which only
+    Daraja has been given.
+    """
+    # Called by Safaricom's servers, which send no credentials
+    authentication_classes = []
+    permission_classes = [AllowAny]
 
-    def send_receipt(self, payment):
-        subject = f'Payment Receipt for Order {payment.order.id}'
-        message = (
-            f"Dear {payment.order.customer.full_name},\n\n"
-            f"Thank you for your payment of KES {payment.amount} for Order {payment.order.id}.\n"
-            f"M-Pesa Transaction Code: {payment.mpesa_code}\n"
-            f"Date: {payment.timestamp}\n\n"
-            f"Best regards,\nCampus Delivery Team"
-        )
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [payment.order.customer.email],
-            fail_silently=True
-        )
\ No newline at end of file
+    def post(self, request, payment_id, token):
+        expected = Payment.objects.filter(id=payment_id).values_list('callback_token', flat=True).first()
+        if expected is None or not secrets.compare_digest(token, expected):
+            return Response({"detail": "Payment not found"}, status=status.HTTP_404_NOT_FOUND)
+        data = request.data.get('Body', {}).get('stkCallback', {})
+        if 'ResultCode' not in data:
+            return Response({"detail": "Invalid callback"}, status=status.HTTP_400_BAD_REQUEST)
+        if data['ResultCode'] == 0:
+            items = data.get('CallbackMetadata', {}).get('Item', [])
+            mpesa_code = next((item.get('Value') for item in items if item.get('Name') == 'MpesaReceiptNumber'), None)
+            complete_payment(payment_id, mpesa_code)
+            return Response({"message": "Payment processed successfully"}, status=status.HTTP_200_OK)
+        # A declined or cancelled payment is still a delivered callback; 200
+        # stops Daraja from retrying it.
+        fail_payment(payment_id)
+        return Response({"message": "Payment failed"}, status=status.HTTP_200_OK)
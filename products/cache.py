@@ -0,0 +1,74 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from campus_delivery.caches import is_shared
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def catalog_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def catalog_cache_enabled():
+    """List caching needs the version to be shared by every worker (see settings)."""
+    return settings.CATALOG_CACHE_ALLOW_LOCAL or is_shared(settings.CATALOG_CACHE_ALIAS)
+
+
+def catalog_version():
+    cache = catalog_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a lost key never brings back an old version number.
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache = catalog_cache()
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        catalog_version()
+
+
+class CatalogCacheMixin:
+    """Serve catalog list responses from the cache.
+
+    Rendered responses are keyed by the full request URL and the catalog
+    version, which is bumped whenever a product is saved or deleted, so edits
+    show up on the next request without explicit purging. The version must
+    live in a cache every worker shares, so nothing is cached on a
+    per-process backend unless ``CATALOG_CACHE_ALLOW_LOCAL``. Only JSON is
+    cached: the browsable API page embeds the requesting user's name and CSRF
+    token.
+    """
+    cached_headers = ('Vary', 'Allow')
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json' or not catalog_cache_enabled():
+            return super().list(request, *args, **kwargs)
+        url = request.build_absolute_uri()
+        digest = hashlib.md5(url.encode()).hexdigest()
+        key = f"catalog:{catalog_version()}:json:{digest}"
+        cached = catalog_cache().get(key)
+        if cached is not None:
+            content, content_type, headers = cached
+            response = HttpResponse(content, content_type=content_type)
+            for name, value in headers.items():
+                response[name] = value
+            return response
+        self.catalog_cache_key = key
+        return super().list(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, 'catalog_cache_key', None)
+        if key and response.status_code == 200:
+            response.render()
+            headers = {name: response[name] for name in self.cached_headers if response.has_header(name)}
+            catalog_cache().set(key, (response.content, response['Content-Type'], headers), settings.CATALOG_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,78 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from products.models import Product
+from products.search import search_products
+from users.models import User
+
+ADJECTIVES = ['fresh', 'ripe', 'organic', 'spicy', 'sweet', 'crispy', 'smoked', 'local', 'green', 'hot']
+NOUNS = [
+    'tomato', 'mango', 'sukuma', 'avocado', 'chapati', 'pilau', 'samosa', 'mandazi', 'banana', 'onion',
+    'haircut', 'braids', 'manicure', 'shoe repair', 'laundry', 'passion juice', 'githeri', 'matoke',
+]
+QUERIES = ['tom', 'fresh mango', 'chap', 'braids', 'organic avocado salad', 'shoe', 'zzz']
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic catalog and time ranked product search against it. "
+        "Runs inside a transaction that is rolled back unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=20, help="Timed runs per query.")
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded products.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            vendor = self.seed(options['products'])
+            self.stdout.write(f"Seeded {options['products']} products for {vendor.email}")
+            for text in QUERIES:
+                self.bench(text, options['repeat'])
+            self.explain(QUERIES[1])
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def seed(self, count):
+        rng = random.Random(42)
+        vendor, _ = User.objects.get_or_create(
+            email='bench-vendor@example.com',
+            defaults={
+                'username': 'bench-vendor@example.com', 'full_name': 'Bench Vendor',
+                'phone': 'bench-0000', 'role': 'vendor', 'is_approved': True,
+            },
+        )
+        batch = []
+        for i in range(count):
+            name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} #{i}"
+            batch.append(Product(
+                vendor=vendor, name=name, description=f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} from campus",
+                price=rng.randint(10, 500), quantity=rng.randint(0, 50), category='other',
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE products_product')
+        return vendor
+
+    def bench(self, text, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = list(search_products(text).values_list('id', flat=True)[:20])
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        self.stdout.write(
+            f"{text!r:28} first page={len(results):2}  "
+            f"median={statistics.median(timings):7.2f}ms  p95={p95:7.2f}ms"
+        )
+
+    def explain(self, text):
+        plan = search_products(text)[:20].explain()
+        self.stdout.write(f"\nPlan for {text!r}:\n{plan}")
@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from users.models import User
 from cloudinary.models import CloudinaryField
@@ -25,6 +27,16 @@ class Product(models.Model):
     type = models.CharField(max_length=20, choices=TYPE_CHOICES, default='tangible')
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default='other')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Weighted tsvector over name (A) and description (B), maintained by a
+    # database trigger (see migration 0003) so bulk writes stay in sync too.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+            GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.type}) by {self.vendor.full_name}"
\ No newline at end of file
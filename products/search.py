@@ -0,0 +1,31 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
+from .models import Product
+
+SEARCH_CONFIG = 'english'
+MAX_SEARCH_TERMS = 8
+
+
+def build_search_query(text):
+    """Turn free text into a prefix-matching tsquery, e.g. ``"fresh tom"`` -> ``fresh:* & tom:*``.
+
+    Returns ``None`` when the text has no searchable terms.
+    """
+    terms = re.findall(r'\w+', text.lower())[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    return SearchQuery(' & '.join(f"{term}:*" for term in terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_products(text, queryset=None):
+    """Products matching ``text``, best match first."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    query = build_search_query(text)
+    if query is None:
+        return queryset.none()
+    return (
+        queryset.filter(search_vector=query)
+        .annotate(rank=SearchRank(F('search_vector'), query))
+        .order_by('-rank', '-id')
+    )
@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .cache import bump_catalog_version
+from .models import Product
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog_cache(sender, **kwargs):
+    # Bumping before commit would let a concurrent reader cache the old rows
+    # under the new version.
+    transaction.on_commit(bump_catalog_version)
@@ -1,5 +1,8 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
+from django.core.cache import cache
 from users.models import User
 from .models import Product
 
@@ -24,6 +27,7 @@ class ProductTests(TestCase):
             role='customer'
         )
         self.client.force_authenticate(user=self.vendor)
+        cache.clear()
         self.product_data = {
             'vendor': self.vendor,  # Pass the User instance directly
             'name': 'Test Product',
@@ -59,10 +63,89 @@ class ProductTests(TestCase):
         self.client.force_authenticate(user=None)
         response = self.client.get('/api/products/')
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data['results']), 1)
 
     def test_filter_products(self):
         Product.objects.create(**self.product_data)
         response = self.client.get('/api/products/filter/?type=tangible&category=vegetable')
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
\ No newline at end of file
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_list_products_cursor_pagination(self):
+        for i in range(3):
+            Product.objects.create(**{**self.product_data, 'name': f'Product {i}'})
+        response = self.client.get('/api/products/?page_size=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['name'] for p in response.data['results']], ['Product 2', 'Product 1'])
+        self.assertIsNone(response.data['previous'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([p['name'] for p in response.data['results']], ['Product 0'])
+        self.assertIsNone(response.data['next'])
+
+    def test_search_products_ranked_with_prefix(self):
+        Product.objects.create(**{**self.product_data, 'name': 'Fresh Tomatoes', 'description': 'Ripe and red'})
+        Product.objects.create(**{**self.product_data, 'name': 'Salad bowl', 'description': 'With fresh tomatoes'})
+        Product.objects.create(**{**self.product_data, 'name': 'Mango juice', 'description': 'Sweet'})
+        response = self.client.get('/api/products/search/?q=tomat')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['name'] for p in response.data['results']], ['Fresh Tomatoes', 'Salad bowl'])
+        response = self.client.get('/api/products/search/?q=fresh+sal')
+        self.assertEqual([p['name'] for p in response.data['results']], ['Salad bowl'])
+
+    def test_search_products_tracks_edits(self):
+        product = Product.objects.create(**{**self.product_data, 'name': 'Sukuma wiki'})
+        product.name = 'Spinach'
+        product.save()
+        self.assertEqual(self.client.get('/api/products/search/?q=sukuma').data['results'], [])
+        self.assertEqual(len(self.client.get('/api/products/search/?q=spin').data['results']), 1)
+        self.assertEqual(self.client.get('/api/products/search/?q=%21%21').data['results'], [])
+
+    def test_catalog_list_is_cached_until_product_changes(self):
+        product = Product.objects.create(**self.product_data)
+        first = self.client.get('/api/products/filter/?category=vegetable')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/products/filter/?category=vegetable')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual((second['Vary'], second['Allow']), (first['Vary'], first['Allow']))
+
+        product.price = 12.50
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            product.save()
+            # Not invalidated until the edit commits
+            self.assertEqual(self.client.get('/api/products/filter/?category=vegetable').content, first.content)
+        self.assertEqual(len(callbacks), 1)
+        response = self.client.get('/api/products/filter/?category=vegetable')
+        self.assertEqual(response.json()['results'][0]['price'], '12.50')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(self.client.get('/api/products/filter/?category=vegetable').json()['results'], [])
+
+    @override_settings(CATALOG_CACHE_ALLOW_LOCAL=False)
+    def test_catalog_list_not_cached_in_per_process_cache(self):
+        # Other workers could not see the version bump, so LocMem is not used
+        Product.objects.create(**self.product_data)
+        self.client.get('/api/products/filter/?category=vegetable')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/products/filter/?category=vegetable')
+        self.assertGreater(len(ctx.captured_queries), 0)
+
+    def test_browsable_catalog_page_is_not_cached(self):
+        Product.objects.create(**self.product_data)
+        self.client.force_authenticate(user=self.customer)
+        page = self.client.get('/api/products/filter/?category=vegetable', HTTP_ACCEPT='text/html')
+        self.assertContains(page, str(self.customer))
+        self.client.force_authenticate(user=self.vendor)
+        page = self.client.get('/api/products/filter/?category=vegetable', HTTP_ACCEPT='text/html')
+        self.assertContains(page, str(self.vendor))
+        self.assertNotContains(page, str(self.customer))
+
+    def test_product_detail_conditional_get(self):
+        product = Product.objects.create(**self.product_data)
+        response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            f'/api/products/{product.id}/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
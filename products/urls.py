@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import ProductListCreateView, ProductDetailView, ProductFilterView
+from .views import ProductListCreateView, ProductDetailView, ProductFilterView, ProductSearchView
 
 urlpatterns = [
     path('products/', ProductListCreateView.as_view(), name='product-list-create'),
     path('products/<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
     path('products/filter/', ProductFilterView.as_view(), name='product-filter'),
+    path('products/search/', ProductSearchView.as_view(), name='product-search'),
 ]
\ No newline at end of file
@@ -3,8 +3,12 @@ from rest_framework.permissions import IsAuthenticated
 from .models import Product
 from .serializers import ProductSerializer
 from .permissions import IsVendorOrReadOnly
+from .search import search_products
+from .cache import CatalogCacheMixin
+from campus_delivery.pagination import SearchResultsPagination
+from campus_delivery.conditional import ConditionalRetrieveMixin
 
-class ProductListCreateView(generics.ListCreateAPIView):
+class ProductListCreateView(CatalogCacheMixin, generics.ListCreateAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [IsVendorOrReadOnly]
@@ -12,12 +16,12 @@ class ProductListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save(vendor=self.request.user)
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProductDetailView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [IsVendorOrReadOnly]
 
-class ProductFilterView(generics.ListAPIView):
+class ProductFilterView(CatalogCacheMixin, generics.ListAPIView):
     serializer_class = ProductSerializer
     permission_classes = [IsVendorOrReadOnly]
 
@@ -29,4 +33,12 @@ class ProductFilterView(generics.ListAPIView):
             queryset = queryset.filter(type=type_filter)
         if category_filter:
             queryset = queryset.filter(category=category_filter)
-        return queryset
\ No newline at end of file
+        return queryset
+
+class ProductSearchView(generics.ListAPIView):
+    serializer_class = ProductSerializer
+    permission_classes = [IsVendorOrReadOnly]
+    pagination_class = SearchResultsPagination
+
+    def get_queryset(self):
+        return search_products(self.request.query_params.get('q', ''))
@@ -0,0 +1,113 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from notifications.models import Notification
+from payment.models import Payment
+from products.models import Product
+from users.models import User
+
+PASSWORD = 'loadtest-password'
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive order -> payment -> M-Pesa callback -> SMS against a running server wired to "
+        "`manage.py run_simulator`, and report end-to-end throughput. Needs the notification "
+        "dispatcher (and process_stk_pushes in async mode) running."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--api', default='http://127.0.0.1:8000', help="Base URL of the running server.")
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--timeout', type=float, default=120, help="Seconds to wait for payments and SMS.")
+
+    def handle(self, *args, **options):
+        customer, product = self.seed()
+        api = options['api'].rstrip('/')
+        response = requests.post(f"{api}/api/login/", json={'username': customer.username, 'password': PASSWORD})
+        if response.status_code != 200:
+            raise CommandError(f"Login failed ({response.status_code}): {response.text[:200]}")
+        headers = {'Authorization': f"Bearer {response.json()['access']}"}
+        sessions = threading.local()
+        timings = {'order': [], 'payment': []}
+
+        def checkout(_):
+            if not hasattr(sessions, 'session'):
+                sessions.session = requests.Session()
+                sessions.session.headers.update(headers)
+            session = sessions.session
+            start = time.perf_counter()
+            order = session.post(f"{api}/api/orders/", json={'items': [{'product_id': product.id, 'quantity': 1}]})
+            timings['order'].append(time.perf_counter() - start)
+            if order.status_code != 201:
+                return None
+            start = time.perf_counter()
+            payment = session.post(
+                f"{api}/api/payment/initiate/", json={'order_id': order.json()['id'], 'phone_number': customer.phone.lstrip('+')}
+            )
+            timings['payment'].append(time.perf_counter() - start)
+            return order.json()['id'] if payment.status_code in (200, 202) else None
+
+        started_at = timezone.now()
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            order_ids = [order_id for order_id in pool.map(checkout, range(options['orders'])) if order_id]
+        requests_done = time.monotonic() - start
+        if not order_ids:
+            raise CommandError("No checkout was accepted; check the server log.")
+        self.stdout.write(
+            f"{len(order_ids)}/{options['orders']} checkouts accepted in {requests_done:.2f}s "
+            f"({len(order_ids) / requests_done:.1f}/s)"
+        )
+        for step, values in timings.items():
+            if values:
+                values.sort()
+                self.stdout.write(
+                    f"  {step:8} median={statistics.median(values) * 1000:7.1f}ms  "
+                    f"p95={values[max(0, int(len(values) * 0.95) - 1)] * 1000:7.1f}ms"
+                )
+
+        paid = sms_sent = 0
+        while time.monotonic() - start < options['timeout']:
+            paid = Payment.objects.filter(order_id__in=order_ids, status='completed').count()
+            sms_sent = Notification.objects.filter(
+                recipient=customer, type='payment_completed', channel='sms', status='sent',
+                created_at__gte=started_at
+            ).count()
+            if paid >= len(order_ids) and sms_sent >= len(order_ids):
+                break
+            time.sleep(0.5)
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            f"{paid} paid and {sms_sent} receipt SMS sent after {elapsed:.2f}s "
+            f"({min(paid, sms_sent) / elapsed:.1f} end-to-end checkouts/s)"
+        )
+
+    def seed(self):
+        vendor, _ = User.objects.get_or_create(
+            username='loadtest-vendor@example.com',
+            defaults={
+                'email': 'loadtest-vendor@example.com', 'full_name': 'Loadtest Vendor',
+                'phone': '+254700000002', 'role': 'vendor', 'is_approved': True,
+            },
+        )
+        customer, created = User.objects.get_or_create(
+            username='loadtest-customer@example.com',
+            defaults={
+                'email': 'loadtest-customer@example.com', 'full_name': 'Loadtest Customer',
+                'phone': '+254700000001', 'role': 'customer',
+            },
+        )
+        if created:
+            customer.set_password(PASSWORD)
+            customer.save()
+        product, _ = Product.objects.get_or_create(
+            vendor=vendor, name='Loadtest lunch',
+            defaults={'price': 150, 'quantity': 1000000, 'type': 'tangible', 'category': 'other'},
+        )
+        return customer, product
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from simulator.server import ProviderSimulator
+
+
+class Command(BaseCommand):
+    help = "Serve a local Daraja and Africa's Talking simulator for offline end-to-end and load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8900)
+        parser.add_argument('--latency', type=float, default=0.05, help="Mean seconds added to every request.")
+        parser.add_argument('--error-rate', type=float, default=0, help="Fraction of requests answered 503.")
+        parser.add_argument('--callback-delay', type=float, default=2.0, help="Seconds before the STK callback.")
+        parser.add_argument('--callback-drop-rate', type=float, default=0, help="Fraction of callbacks never sent.")
+        parser.add_argument('--callback-result', type=int, default=0, help="ResultCode reported (0 = paid).")
+
+    def handle(self, *args, **options):
+        simulator = ProviderSimulator(
+            host=options['host'], port=options['port'], latency=options['latency'],
+            error_rate=options['error_rate'], callback_delay=options['callback_delay'],
+            callback_drop_rate=options['callback_drop_rate'], callback_result=options['callback_result'],
+        )
+        self.stdout.write(
+            f"Provider simulator listening on {simulator.url}. Start the app with:\n"
+            f"  MPESA_API_BASE_URL={simulator.url} AT_API_BASE_URL={simulator.url} "
+            f"NOTIFICATION_SMS_TRANSPORT=notifications.transports.HttpSmsTransport"
+        )
+        try:
+            simulator.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            simulator.server.server_close()
+            self.stdout.write(
+                f"Served {len(simulator.requests)} requests, {simulator.callbacks_sent} callbacks, "
+                f"{len(simulator.sms)} SMS"
+            )
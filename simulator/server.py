@@ -0,0 +1,176 @@
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+import requests
+
+
+class ProviderSimulator:
+    """Local stand-in for the Daraja (M-Pesa) and Africa's Talking SMS APIs.
+
+    Serves the endpoints the app calls: OAuth, STK push, STK push query and
+    Africa's Talking's ``/version1/messaging``. After an accepted STK push it
+    calls the request's ``CallBackURL`` like Daraja does, ``callback_delay``
+    seconds later. ``latency`` (seconds, per request, +/-50% jitter) and
+    ``error_rate`` (fraction of requests answered 503) make it slow or flaky;
+    ``callback_drop_rate`` loses callbacks so reconciliation can be exercised.
+
+    ``query_results[checkout_request_id]`` holds the result an STK query
+    reports (set when the simulated customer answers, or by tests). Sent SMS
+    are recorded in ``sms``. Usable as a context manager that serves from a
+    background thread::
+
+        with ProviderSimulator(callback_delay=0.1) as simulator:
+            ...  # point MPESA_API_BASE_URL / AT_API_BASE_URL at simulator.url
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, error_rate=0, callback_delay=1.0,
+                 callback_drop_rate=0, callback_result=0, callbacks=True, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.callback_delay = callback_delay
+        self.callback_drop_rate = callback_drop_rate
+        self.callback_result = callback_result
+        self.callbacks = callbacks
+        self.random = random.Random(seed)
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.query_results = {}
+        self.sms = []
+        self.requests = []
+        self.callbacks_sent = 0
+        self.server = ThreadingHTTPServer((host, port), self.handler_class())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def next_id(self):
+        with self.lock:
+            return next(self.ids)
+
+    def handler_class(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real APIs
+
+            def do_GET(self):
+                self.handle_request('GET')
+
+            def do_POST(self):
+                self.handle_request('POST')
+
+            def handle_request(self, method):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with simulator.lock:
+                    simulator.requests.append((method, self.path))
+                if simulator.latency:
+                    time.sleep(simulator.latency * simulator.random.uniform(0.5, 1.5))
+                if simulator.error_rate and simulator.random.random() < simulator.error_rate:
+                    return self.reply({'errorMessage': 'Simulated outage'}, status=503)
+                route = (method, self.path.split('?')[0])
+                if route == ('GET', '/oauth/v1/generate'):
+                    return self.reply({'access_token': f"sim-token-{simulator.next_id()}", 'expires_in': '3599'})
+                if route == ('POST', '/mpesa/stkpush/v1/processrequest'):
+                    return self.reply(simulator.stk_push(json.loads(body or b'{}')))
+                if route == ('POST', '/mpesa/stkpushquery/v1/query'):
+                    return self.reply(*simulator.stk_query(json.loads(body or b'{}')))
+                if route == ('POST', '/version1/messaging'):
+                    form = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+                    return self.reply(simulator.send_sms(form), status=201)
+                self.reply({'errorMessage': 'Not found'}, status=404)
+
+            def reply(self, data, status=200):
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def stk_push(self, payload):
+        checkout_request_id = f"ws_CO_sim_{self.next_id()}"
+        if self.callbacks:
+            timer = threading.Timer(
+                self.callback_delay, self.answer, (checkout_request_id, payload.get('CallBackURL'), payload.get('Amount'))
+            )
+            timer.daemon = True
+            timer.start()
+        return {
+            'MerchantRequestID': f"sim-merchant-{self.next_id()}",
+            'CheckoutRequestID': checkout_request_id,
+            'ResponseCode': '0',
+            'ResponseDescription': 'Success. Request accepted for processing',
+            'CustomerMessage': 'Success. Request accepted for processing',
+        }
+
+    def answer(self, checkout_request_id, callback_url, amount):
+        """The simulated customer responds to the prompt; Daraja reports it to the callback URL."""
+        result_code = self.callback_result
+        with self.lock:
+            self.query_results[checkout_request_id] = result_code
+        if not callback_url or self.random.random() < self.callback_drop_rate:
+            return
+        callback = {'MerchantRequestID': 'sim', 'CheckoutRequestID': checkout_request_id, 'ResultCode': result_code}
+        if result_code == 0:
+            callback['ResultDesc'] = 'The service request is processed successfully.'
+            callback['CallbackMetadata'] = {'Item': [
+                {'Name': 'Amount', 'Value': amount},
+                {'Name': 'MpesaReceiptNumber', 'Value': f"SIM{self.next_id():07d}"},
+            ]}
+        else:
+            callback['ResultDesc'] = 'Request cancelled by user'
+        try:
+            requests.post(callback_url, json={'Body': {'stkCallback': callback}}, timeout=10)
+            with self.lock:
+                self.callbacks_sent += 1
+        except requests.RequestException:
+            pass
+
+    def stk_query(self, payload):
+        checkout_request_id = payload.get('CheckoutRequestID')
+        with self.lock:
+            result_code = self.query_results.get(checkout_request_id)
+        if result_code is None:
+            return {'errorCode': '500.001.1001', 'errorMessage': 'The transaction is being processed'}, 500
+        return {
+            'CheckoutRequestID': checkout_request_id,
+            'ResponseCode': '0',
+            'ResultCode': str(result_code),
+            'ResultDesc': 'The service request is processed successfully.' if result_code == 0
+            else 'Request cancelled by user',
+        }, 200
+
+    def send_sms(self, form):
+        recipients = [number.strip() for number in form.get('to', '').split(',') if number.strip()]
+        with self.lock:
+            self.sms.append({'message': form.get('message', ''), 'recipients': recipients})
+        return {'SMSMessageData': {
+            'Message': f"Sent to {len(recipients)}/{len(recipients)} Total Cost: KES {0.8 * len(recipients):.4f}",
+            'Recipients': [
+                {'number': number, 'status': 'Success', 'statusCode': 101, 'cost': 'KES 0.8000',
+                 'messageId': f"ATXid_sim_{self.next_id()}"}
+                for number in recipients
+            ],
+        }}
@@ -0,0 +1,55 @@
+import time
+from io import StringIO
+from django.conf import settings
+from django.core.management import call_command
+from django.test import LiveServerTestCase, override_settings
+from rest_framework.test import APIClient
+from notifications.models import Notification
+from orders.models import Order
+from payment.models import Payment
+from payment.mpesa import token_cache
+from users.models import User
+from .server import ProviderSimulator
+
+
+class ProviderSimulatorTests(LiveServerTestCase):
+    # The simulator calls the M-Pesa callback on the live test server over HTTP.
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username='customer@example.com',
+            email='customer@example.com',
+            password='testpass123',
+            full_name='Customer User',
+            phone='+254712345678',
+            role='customer'
+        )
+        self.order = Order.objects.create(customer=self.customer, total_price=20.00)
+        self.simulator = ProviderSimulator(callback_delay=0.05)
+        self.simulator.__enter__()
+        self.addCleanup(self.simulator.__exit__)
+        token_cache.clear()
+
+    def test_checkout_end_to_end(self):
+        outbound = {name: dict(config, base_url=self.simulator.url) for name, config in settings.OUTBOUND_HTTP.items()}
+        with override_settings(
+            OUTBOUND_HTTP=outbound,
+            MPESA_CALLBACK_URL=self.live_server_url,
+            NOTIFICATION_SMS_TRANSPORT='notifications.transports.HttpSmsTransport',
+        ):
+            client = APIClient()
+            client.force_authenticate(user=self.customer)
+            response = client.post('/api/payment/initiate/', {'order_id': self.order.id, 'phone_number': '254712345678'})
+            self.assertEqual(response.status_code, 200)
+            payment = Payment.objects.get(id=response.data['payment_id'])
+            for _ in range(100):
+                payment.refresh_from_db()
+                if payment.status != 'pending':
+                    break
+                time.sleep(0.05)
+            self.assertEqual(payment.status, 'completed')
+            self.assertTrue(payment.mpesa_code.startswith('SIM'))
+
+            call_command('dispatch_notifications', '--drain', stdout=StringIO())
+        receipt = Notification.objects.get(type='payment_completed', channel='sms')
+        self.assertEqual(receipt.status, 'sent')
+        self.assertIn({'message': receipt.message, 'recipients': [self.customer.phone]}, self.simulator.sms)